@@ -0,0 +1,285 @@
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from typing import NamedTuple
+
+from sqlalchemy import asc, event, select
+from sqlalchemy.orm import Session
+
+from . import models
+from .config import settings
+from .db_routing import CATALOG, db_routing
+
+
+class LessonRow(NamedTuple):
+    id: int
+    module_id: int
+    course_id: int
+    title: str
+    lesson_type: str
+    difficulty: int
+    sort_order: int
+
+
+class ModuleRow(NamedTuple):
+    id: int
+    course_id: int
+    title: str
+    sort_order: int
+    lessons: tuple[LessonRow, ...]
+
+
+class CourseRow(NamedTuple):
+    id: int
+    title: str
+    description: str | None
+    modules: tuple[ModuleRow, ...]
+    lessons: tuple[LessonRow, ...]  # module order, then lesson order
+
+
+class CatalogSnapshot:
+    """
+    Immutable in-memory copy of the Course -> Module -> Lesson tree and the
+    lesson prerequisite DAG. Built once per catalog version and shared by
+    every read route.
+
+    Lesson bodies (Lesson.content, markdown or quiz JSON) are the bulk of
+    the catalog and only the lesson detail and quiz routes need them, so
+    they are not part of the tree: `lesson_content` fetches them one at a
+    time into a bounded LRU that is dropped with the snapshot. The ETags of
+    rendered responses (see http_cache) are memoised per snapshot the same
+    way.
+    """
+
+    __slots__ = (
+        "version", "loaded_at", "courses", "course_ids", "modules", "lessons", "lesson_ids",
+        "position", "prereqs", "dependents", "_content", "_etags", "_memo_lock",
+    )
+
+    def __init__(self, version: int, courses: dict[int, CourseRow], edges: dict[int, tuple[int, ...]]):
+        self.version = version
+        self.loaded_at = time.monotonic()
+        self.courses = courses
+        self.course_ids = tuple(sorted(courses))
+        self.modules = {m.id: m for c in courses.values() for m in c.modules}
+        self.lessons = {L.id: L for c in courses.values() for L in c.lessons}
+        self.lesson_ids = tuple(L.id for cid in self.course_ids for L in courses[cid].lessons)
+        self.position = {lid: i for i, lid in enumerate(self.lesson_ids)}
+
+        # prerequisite DAG: explicit edges where a course has any, otherwise
+        # every lesson requires all lessons of the previous module
+        self.prereqs: dict[int, tuple[int, ...]] = {}
+        for c in courses.values():
+            if any(L.id in edges for L in c.lessons):
+                for L in c.lessons:
+                    if L.id in edges:
+                        self.prereqs[L.id] = edges[L.id]
+                continue
+            prev: tuple[int, ...] = ()
+            for m in c.modules:
+                if prev:
+                    for L in m.lessons:
+                        self.prereqs[L.id] = prev
+                if m.lessons:
+                    prev = tuple(L.id for L in m.lessons)
+
+        dependents: dict[int, list[int]] = {}
+        for lid, pre in self.prereqs.items():
+            for p in pre:
+                dependents.setdefault(p, []).append(lid)
+        self.dependents = {p: tuple(ds) for p, ds in dependents.items()}
+
+        self._content: OrderedDict[int, str | None] = OrderedDict()
+        self._etags: OrderedDict[tuple, str] = OrderedDict()
+        self._memo_lock = threading.Lock()
+
+    def course(self, course_id: int) -> CourseRow | None:
+        return self.courses.get(course_id)
+
+    def lesson(self, lesson_id: int) -> LessonRow | None:
+        return self.lessons.get(lesson_id)
+
+    def cached_content(self, lesson_id: int):
+        """Cached body of a lesson, or _MISSING."""
+        with self._memo_lock:
+            if lesson_id in self._content:
+                self._content.move_to_end(lesson_id)
+                return self._content[lesson_id]
+        return _MISSING
+
+    def lesson_content(self, db: Session, lesson_id: int) -> str | None:
+        content = self.cached_content(lesson_id)
+        if content is _MISSING:
+            content = db.execute(select(models.Lesson.content).where(models.Lesson.id == lesson_id)).scalar()
+            with self._memo_lock:
+                self._content[lesson_id] = content
+                while len(self._content) > settings.CATALOG_CONTENT_MAX_ENTRIES:
+                    self._content.popitem(last=False)
+        return content
+
+    def etag(self, key: tuple) -> str | None:
+        with self._memo_lock:
+            return self._etags.get(key)
+
+    def remember_etag(self, key: tuple, etag: str) -> None:
+        with self._memo_lock:
+            self._etags[key] = etag
+            self._etags.move_to_end(key)
+            while len(self._etags) > settings.CATALOG_ETAG_MAX_ENTRIES:
+                self._etags.popitem(last=False)
+
+
+_MISSING = object()
+
+
+_lock = threading.Lock()  # guards _version/_snapshot; never held across database IO
+_reload_lock = threading.Lock()  # one reload at a time among worker threads
+_async_reload_lock = asyncio.Lock()  # one reload at a time among coroutines
+_version = 0
+_snapshot: CatalogSnapshot | None = None
+
+
+def current_version() -> int:
+    return _version
+
+
+def bump_version() -> int:
+    """Mark the in-memory catalog stale; the next read reloads it."""
+    global _version
+    with _lock:
+        _version += 1
+        return _version
+
+
+def _load(db: Session, version: int) -> CatalogSnapshot:
+    # plain row tuples of just the columns the tree needs: no ORM objects, no Lesson.content
+    C, M, L = models.Course, models.Module, models.Lesson
+    courses = db.execute(select(C.id, C.title, C.description).order_by(asc(C.id))).all()
+    modules = db.execute(
+        select(M.id, M.course_id, M.title, M.sort_order)
+        .order_by(asc(M.course_id), asc(M.sort_order), asc(M.id))
+    ).all()
+    lessons = db.execute(
+        select(L.id, L.module_id, L.title, L.lesson_type, L.difficulty, L.sort_order)
+        .order_by(asc(L.module_id), asc(L.sort_order), asc(L.id))
+    ).all()
+
+    module_course = {m.id: m.course_id for m in modules}
+    lessons_by_module: dict[int, list[LessonRow]] = {}
+    for L in lessons:
+        lessons_by_module.setdefault(L.module_id, []).append(LessonRow(
+            L.id, L.module_id, module_course.get(L.module_id), L.title,
+            L.lesson_type, L.difficulty, L.sort_order,
+        ))
+
+    modules_by_course: dict[int, list[ModuleRow]] = {}
+    for m in modules:
+        modules_by_course.setdefault(m.course_id, []).append(ModuleRow(
+            m.id, m.course_id, m.title, m.sort_order, tuple(lessons_by_module.get(m.id, ())),
+        ))
+
+    out = {}
+    for c in courses:
+        mods = tuple(modules_by_course.get(c.id, ()))
+        out[c.id] = CourseRow(
+            c.id, c.title, c.description, mods, tuple(L for m in mods for L in m.lessons),
+        )
+
+    edges: dict[int, list[int]] = {}
+    for lid, pre in db.query(models.LessonPrerequisite.lesson_id, models.LessonPrerequisite.prerequisite_id):
+        edges.setdefault(lid, []).append(pre)
+    return CatalogSnapshot(version, out, {lid: tuple(pre) for lid, pre in edges.items()})
+
+
+def _is_fresh(snap: CatalogSnapshot | None) -> bool:
+    return snap is not None and snap.version == _version and (
+        time.monotonic() - snap.loaded_at < settings.CATALOG_TTL_SECONDS
+    )
+
+
+def get_snapshot(db: Session) -> CatalogSnapshot:
+    """
+    Return the current catalog snapshot, reloading it through `db` only when
+    the catalog version changed (or the safety TTL expired, which covers
+    reseeds done by another process).
+    """
+    snap = _snapshot
+    if _is_fresh(snap):
+        return snap
+
+    with _reload_lock:
+        snap = _snapshot
+        if _is_fresh(snap):
+            return snap
+        return _reload(db)
+
+
+async def get_snapshot_async(adb) -> CatalogSnapshot:
+    """
+    get_snapshot for async handlers; only a reload touches the database.
+    The reload's IO yields to the event loop, so reloads are serialised with
+    an asyncio.Lock: a thread lock held across it would block the loop
+    thread as soon as a second coroutine wanted it.
+    """
+    snap = _snapshot
+    if _is_fresh(snap):
+        return snap
+
+    async with _async_reload_lock:
+        snap = _snapshot
+        if _is_fresh(snap):
+            return snap
+        return await adb.run_sync(_reload)
+
+
+def _reload(db: Session) -> CatalogSnapshot:
+    """Load without holding any lock, then install the result under _lock."""
+    global _snapshot, _version
+    fresh = _load(db, _version)
+    with _lock:
+        snap = _snapshot
+        if _is_fresh(snap):
+            return snap  # a concurrent reload (worker thread vs coroutine) got there first
+        if snap is not None and snap.version == fresh.version == _version and (
+            fresh.courses != snap.courses or fresh.prereqs != snap.prereqs
+        ):
+            # changed behind our back (e.g. reseeded by another process)
+            _version += 1
+            fresh.version = _version
+        # a bump during the load leaves `fresh` on the old version: the next read reloads again
+        _snapshot = fresh
+        return fresh
+
+
+async def lesson_content_async(adb, snap: CatalogSnapshot, lesson_id: int) -> str | None:
+    content = snap.cached_content(lesson_id)
+    if content is _MISSING:
+        content = await adb.run_sync(snap.lesson_content, lesson_id)
+    return content
+
+
+# ----------------------------
+# Bump the version on ORM edits to catalog tables
+# ----------------------------
+_CATALOG_MODELS = (models.Course, models.Module, models.Lesson, models.LessonPrerequisite)
+
+
+@event.listens_for(Session, "after_flush")
+def _track_catalog_writes(session, flush_context):
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(obj, _CATALOG_MODELS):
+            session.info["catalog_dirty"] = True
+            return
+
+
+@event.listens_for(Session, "after_commit")
+def _bump_on_commit(session):
+    if session.info.pop("catalog_dirty", False):
+        bump_version()
+        db_routing.wrote(CATALOG)
+
+
+@event.listens_for(Session, "after_rollback")
+def _clear_on_rollback(session):
+    session.info.pop("catalog_dirty", None)
@@ -1,3 +1,5 @@
+from typing import Literal
+
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
@@ -8,7 +10,84 @@ class Settings(BaseSettings):
 
     # Optional defaults
     JWT_ALG: str = "HS256"
-    ACCESS_TOKEN_MINUTES: int = 60 * 24  # 24h
+    ACCESS_TOKEN_MINUTES: int = 15  # short-lived; clients renew via /auth/refresh
+    REFRESH_TOKEN_DAYS: int = 30
+    TOKEN_CACHE_MAX_ENTRIES: int = 50_000  # verified-token cache (0 disables it)
+    # bcrypt: cost (changing it rehashes on next login) and the hashing pool;
+    # at most HASH_WORKERS + HASH_QUEUE_MAX requests hash at once, the rest get 503
+    BCRYPT_ROUNDS: int = 12
+    HASH_WORKERS: int = 2
+    HASH_QUEUE_MAX: int = 16
+    HASH_RETRY_AFTER_SECONDS: int = 2
+
+    # /auth/login token buckets, checked before bcrypt ("memory" or "module:Class")
+    LOGIN_RATE_BACKEND: str = "memory"
+    LOGIN_RATE_MAX_KEYS: int = 100_000
+    LOGIN_IP_PER_MINUTE: float = 10
+    LOGIN_IP_BURST: float = 20
+    LOGIN_ACCOUNT_PER_MINUTE: float = 2
+    LOGIN_ACCOUNT_BURST: float = 5
+    # Peers (IPs/CIDRs, comma-separated) whose X-Forwarded-For is believed when
+    # keying the per-IP bucket. The client is the right-most X-Forwarded-For hop
+    # that is not trusted. Loopback only by default: a trusted peer that is not
+    # really a proxy (e.g. the Docker bridge gateway under `docker run -p`) lets
+    # callers choose their own bucket. Behind Railway's proxy, set this to the
+    # proxy's private range (e.g. TRUSTED_PROXIES=127.0.0.1,::1,100.64.0.0/10).
+    TRUSTED_PROXIES: str = "127.0.0.1,::1"
+
+    # user_id -> (token_version, role); TTL bounds revocation lag across workers
+    USER_CACHE_MAX_ENTRIES: int = 50_000
+    USER_CACHE_TTL_SECONDS: int = 60
+
+    # In-memory catalog snapshot: max age before a forced reload (covers reseeds from another process)
+    CATALOG_TTL_SECONDS: int = 300
+    # Lesson bodies kept in memory per snapshot (LRU), fetched on first use
+    CATALOG_CONTENT_MAX_ENTRIES: int = 2_000
+    # Conditional GET on /courses and /lessons: memoised ETags per snapshot, and the Cache-Control sent
+    CATALOG_ETAG_MAX_ENTRIES: int = 10_000
+    CATALOG_CACHE_CONTROL: str = "public, max-age=60"
+
+    # Per-user recommendation result cache (0 entries disables it)
+    REC_CACHE_MAX_ENTRIES: int = 50_000
+    REC_CACHE_TTL_SECONDS: int = 600
+
+    # Per-user unlocked-lesson frontiers kept in memory (prerequisite DAG)
+    FRONTIER_MAX_USERS: int = 20_000
+
+    # Background writer for recommendation_logs
+    REC_LOG_BATCH_SIZE: int = 200
+    REC_LOG_FLUSH_SECONDS: float = 2.0
+    REC_LOG_QUEUE_MAX: int = 20_000
+
+    # Connection pool (ignored for in-memory SQLite)
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30
+    DB_POOL_RECYCLE: int = 1800  # seconds, -1 disables
+    # Pre-ping on checkout: "always" (every checkout), "idle" (only connections
+    # idle >= DB_PRE_PING_IDLE_SECONDS) or "never"
+    DB_PRE_PING: Literal["always", "idle", "never"] = "idle"
+    DB_PRE_PING_IDLE_SECONDS: float = 30
+
+    # Optional read replica for the GET handlers. A user's reads (and everyone's
+    # catalog reads after a catalog edit) stay on the primary for
+    # READ_YOUR_WRITES_SECONDS after a write, so nobody reads behind their own writes
+    DATABASE_READ_URL: str | None = None
+    READ_YOUR_WRITES_SECONDS: float = 10
+    READ_YOUR_WRITES_MAX_KEYS: int = 100_000
+
+    # Apply pending schema migrations (app/migrations.py) when the app starts
+    DB_MIGRATE_ON_STARTUP: bool = True
+
+    # Per-request SQL stats in a Server-Timing header and the "app.requests" log
+    SQL_METRICS: bool = True
+    # Level of the "app.requests" JSON lines, written to stderr ("" leaves that logger to your logging config)
+    SQL_METRICS_LOG_LEVEL: str = "INFO"
+    # Opt-in N+1 detector: warn when one statement runs this many times in a request (0 = off)
+    SQL_N_PLUS_ONE_THRESHOLD: int = 0
+
+    # Serve the hot read endpoints from async handlers on an async engine
+    DB_ASYNC: bool = False
 
     # allow local .env usage
     model_config = SettingsConfigDict(env_file=".env", extra="ignore")
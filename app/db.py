@@ -1,10 +1,40 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, DeclarativeBase
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.orm import sessionmaker, DeclarativeBase, Session
 from .config import settings
+from .pool_metrics import InstrumentedQueuePool, PoolMetrics, install_idle_ping, pool_metrics, read_pool_metrics
 
-engine = create_engine(settings.DATABASE_URL, pool_pre_ping=True)
+
+def _make_engine(url: str, metrics: PoolMetrics):
+    kwargs = {"pool_pre_ping": settings.DB_PRE_PING == "always"}
+    u = make_url(url)
+    if not (u.get_backend_name() == "sqlite" and u.database in (None, "", ":memory:")):
+        kwargs.update(
+            poolclass=InstrumentedQueuePool.recording_to(metrics),
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_timeout=settings.DB_POOL_TIMEOUT,
+            pool_recycle=settings.DB_POOL_RECYCLE,
+        )
+    eng = create_engine(url, **kwargs)
+    if settings.DB_PRE_PING == "idle":
+        install_idle_ping(eng, settings.DB_PRE_PING_IDLE_SECONDS, metrics)
+    return eng
+
+
+engine = _make_engine(settings.DATABASE_URL, pool_metrics)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# replica for read-only requests (see db_routing); the primary when none is configured
+read_engine = _make_engine(settings.DATABASE_READ_URL, read_pool_metrics) if settings.DATABASE_READ_URL else engine
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
+
+
+@event.listens_for(ReadSessionLocal, "before_flush")
+def _reject_writes(session, flush_context, instances):
+    raise RuntimeError("read-only session: write through SessionLocal")
+
+
 class Base(DeclarativeBase):
     pass
 
@@ -13,4 +43,15 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+def dialect_insert(db):
+    """INSERT construct with ON CONFLICT support for the backend of a Session or Connection (Postgres or SQLite)."""
+    name = (db.get_bind() if isinstance(db, Session) else db).dialect.name
+    if name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        raise NotImplementedError(f"upsert not supported on {name}")
+    return insert
@@ -0,0 +1,54 @@
+"""
+Async engine/session next to the sync ones in db.py, used by the async
+versions of the hot read endpoints when DB_ASYNC is enabled. The async
+driver is derived from DATABASE_URL (asyncpg for Postgres, aiosqlite for
+SQLite); on Postgres the pool settings mirror the sync engine. With
+DATABASE_READ_URL set there is an async replica engine too, and
+db_routing.async_session() picks between them like session() does.
+"""
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from .config import settings
+from .pool_metrics import (
+    InstrumentedAsyncQueuePool, PoolMetrics, async_pool_metrics, async_read_pool_metrics, install_idle_ping,
+)
+
+_ASYNC_DRIVERS = {"postgresql": "asyncpg", "sqlite": "aiosqlite"}
+
+
+def async_url(url: str) -> str:
+    u = make_url(url)
+    backend = u.get_backend_name()
+    if backend not in _ASYNC_DRIVERS:
+        raise NotImplementedError(f"no async driver configured for {backend}")
+    return u.set(drivername=f"{backend}+{_ASYNC_DRIVERS[backend]}").render_as_string(hide_password=False)
+
+
+def _make_async_engine(url: str, metrics: PoolMetrics):
+    kwargs = {"pool_pre_ping": settings.DB_PRE_PING == "always"}
+    if make_url(url).get_backend_name() != "sqlite":  # aiosqlite runs without a pool
+        kwargs.update(
+            poolclass=InstrumentedAsyncQueuePool.recording_to(metrics),
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_timeout=settings.DB_POOL_TIMEOUT,
+            pool_recycle=settings.DB_POOL_RECYCLE,
+        )
+    eng = create_async_engine(async_url(url), **kwargs)
+    if settings.DB_PRE_PING == "idle":
+        install_idle_ping(eng.sync_engine, settings.DB_PRE_PING_IDLE_SECONDS, metrics)
+    return eng
+
+
+async_engine = _make_async_engine(settings.DATABASE_URL, async_pool_metrics) if settings.DB_ASYNC else None
+async_read_engine = (
+    _make_async_engine(settings.DATABASE_READ_URL, async_read_pool_metrics)
+    if settings.DB_ASYNC and settings.DATABASE_READ_URL else async_engine
+)
+AsyncSessionLocal = (
+    async_sessionmaker(async_engine, expire_on_commit=False, autoflush=False) if async_engine else None
+)
+AsyncReadSessionLocal = (
+    async_sessionmaker(async_read_engine, expire_on_commit=False, autoflush=False) if async_read_engine else None
+)
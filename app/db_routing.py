@@ -0,0 +1,79 @@
+"""
+Read/write session routing. GET handlers take their session from
+`db_routing.session(user_id)` (async handlers: `async_session(user_id)`),
+which is bound to the read replica (DATABASE_READ_URL) unless that user,
+or the catalog, wrote to the primary within READ_YOUR_WRITES_SECONDS;
+writes always use SessionLocal. Recent writes are tracked per process.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from sqlalchemy.orm import Session
+
+from .config import settings
+from .db import ReadSessionLocal, SessionLocal, engine, read_engine
+from .db_async import AsyncReadSessionLocal, AsyncSessionLocal
+
+CATALOG = "catalog"  # key marked by catalog edits; pins every read to the primary
+
+
+class ReadRouting:
+    def __init__(self, window_seconds: float, max_keys: int):
+        self.window = window_seconds
+        self.max_keys = max_keys
+        self._until: OrderedDict[object, float] = OrderedDict()  # key -> end of window, oldest first
+        self._lock = threading.Lock()
+        self.replica_reads = 0
+        self.primary_reads = 0
+
+    def wrote(self, key) -> None:
+        """Record a committed write by `key` (a user id or CATALOG)."""
+        if self.window <= 0 or read_engine is engine:
+            return
+        now = time.monotonic()
+        with self._lock:
+            self._until[key] = now + self.window
+            self._until.move_to_end(key)
+            # same window for every key, so the front is always the first to expire
+            while self._until and (next(iter(self._until.values())) <= now or len(self._until) > self.max_keys):
+                self._until.popitem(last=False)
+
+    def _recent(self, key, now: float) -> bool:
+        until = self._until.get(key)
+        return until is not None and until > now
+
+    def _use_primary(self, user_id: int | None) -> bool:
+        now = time.monotonic()
+        with self._lock:
+            primary = self._recent(CATALOG, now) or (user_id is not None and self._recent(user_id, now))
+            if primary:
+                self.primary_reads += 1
+            else:
+                self.replica_reads += 1
+        return primary
+
+    def session(self, user_id: int | None = None) -> Session:
+        """Session for a read-only request on behalf of `user_id` (None: anonymous)."""
+        if read_engine is engine:
+            return SessionLocal()
+        return SessionLocal() if self._use_primary(user_id) else ReadSessionLocal()
+
+    def async_session(self, user_id: int | None = None):
+        """session() for the async handlers (DB_ASYNC)."""
+        if read_engine is engine:
+            return AsyncSessionLocal()
+        return AsyncSessionLocal() if self._use_primary(user_id) else AsyncReadSessionLocal()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "replica": read_engine is not engine,
+                "window_seconds": self.window,
+                "sticky_keys": len(self._until),
+                "replica_reads": self.replica_reads,
+                "primary_reads": self.primary_reads,
+            }
+
+
+db_routing = ReadRouting(settings.READ_YOUR_WRITES_SECONDS, settings.READ_YOUR_WRITES_MAX_KEYS)
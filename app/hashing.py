@@ -0,0 +1,58 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from fastapi import HTTPException
+
+from .config import settings
+from .security import hash_password, verify_and_update
+
+
+class HashPool:
+    """
+    Dedicated bcrypt executor with admission control. bcrypt releases the
+    GIL, so a small thread pool gives real parallelism; the semaphore caps
+    running + waiting jobs so a login storm is turned away with 503. Callers
+    await the job, so no request thread waits on bcrypt, only the pool's own.
+    """
+
+    def __init__(self, workers: int, queue_max: int, retry_after: int):
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bcrypt")
+        self._slots = threading.BoundedSemaphore(workers + queue_max)
+        self.retry_after = retry_after
+        self.completed = 0
+        self.rejected = 0
+
+    async def run(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            self.rejected += 1
+            raise HTTPException(
+                503, "Server busy, please retry", headers={"Retry-After": str(self.retry_after)},
+            )
+        try:
+            fut = self._executor.submit(fn, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        # the slot is held until bcrypt finishes, even if the request is cancelled first
+        fut.add_done_callback(self._done)
+        return await asyncio.wrap_future(fut)
+
+    def _done(self, fut) -> None:
+        self._slots.release()
+        self.completed += 1
+
+    def stats(self) -> dict:
+        return {"completed": self.completed, "rejected": self.rejected}
+
+
+hash_pool = HashPool(settings.HASH_WORKERS, settings.HASH_QUEUE_MAX, settings.HASH_RETRY_AFTER_SECONDS)
+
+
+async def hash_password_pooled(pw: str) -> str:
+    return await hash_pool.run(hash_password, pw)
+
+
+async def verify_password_pooled(pw: str, hashed: str) -> tuple[bool, str | None]:
+    """(valid, new_hash); new_hash is set when the stored hash should be upgraded."""
+    return await hash_pool.run(verify_and_update, pw, hashed)
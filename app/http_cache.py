@@ -0,0 +1,53 @@
+"""
+Conditional GET for catalog responses. A response's ETag is a hash of its
+JSON body, memoised on the catalog snapshot under a route-specific key the
+first time the body is built. Because the key dies with the snapshot,
+ETags change whenever the catalog does. A later If-None-Match for the same
+key is answered with 304 from memory, without building the body or
+touching the database.
+"""
+import hashlib
+import json
+
+from fastapi import Request, Response
+
+from .catalog import CatalogSnapshot
+from .config import settings
+
+
+def body_etag(body) -> str:
+    raw = json.dumps(body, sort_keys=True, separators=(",", ":"), default=str).encode()
+    return '"' + hashlib.sha256(raw).hexdigest()[:32] + '"'
+
+
+def _matches(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(t.strip().removeprefix("W/") == etag for t in if_none_match.split(","))
+
+
+def _not_modified_response(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": settings.CATALOG_CACHE_CONTROL})
+
+
+def not_modified(request: Request, snap: CatalogSnapshot, key: tuple) -> Response | None:
+    """304 response when the client already holds the current body for `key`, else None."""
+    etag = snap.etag(key)
+    if etag is not None and _matches(request.headers.get("if-none-match"), etag):
+        return _not_modified_response(etag)
+    return None
+
+
+def with_etag(request: Request, response: Response, snap: CatalogSnapshot, key: tuple, body):
+    """Tag a freshly built `body` (memoising its ETag for `key`); 304 if the client has it already."""
+    etag = snap.etag(key)
+    if etag is None:
+        etag = body_etag(body)
+        snap.remember_etag(key, etag)
+    if _matches(request.headers.get("if-none-match"), etag):
+        return _not_modified_response(etag)
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = settings.CATALOG_CACHE_CONTROL
+    return body
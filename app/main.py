@@ -2,11 +2,16 @@ from fastapi import FastAPI
 from fastapi.security import HTTPBearer
 from fastapi.middleware.cors import CORSMiddleware
 
-from .routers import auth, courses, recommendation, course_detail, lesson_detail, progress, lessons
+from .routers import auth, courses, recommendation, course_detail, lesson_detail, progress, lessons, internal
 
 from .db import SessionLocal
 from .seed import run_seed
 from .models import Course
+from .rec_log import rec_log
+from .config import settings
+from .db_async import async_engine, async_read_engine
+from .migrations import migrate
+from .sql_metrics import SqlMetricsMiddleware, configure_request_log
 
 app = FastAPI(title="Adaptive E-Learning API", redirect_slashes=False)
 app.security = [HTTPBearer()]
@@ -22,8 +27,20 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing", "X-Next-Cursor", "Link", "ETag"],
 )
 
+if settings.SQL_METRICS:
+    app.add_middleware(SqlMetricsMiddleware)
+    configure_request_log(settings.SQL_METRICS_LOG_LEVEL)
+
+@app.on_event("startup")
+def startup_migrate():
+    if settings.DB_MIGRATE_ON_STARTUP:
+        applied = migrate()
+        if applied:
+            print(f"✅ Applied migrations {applied}")
+
 @app.on_event("startup")
 def startup_seed():
     db = SessionLocal()
@@ -37,6 +54,29 @@ def startup_seed():
     finally:
         db.close()
 
+@app.on_event("startup")
+def startup_rec_log():
+    rec_log.start()
+
+@app.on_event("shutdown")
+def shutdown_rec_log():
+    rec_log.stop()
+
+@app.on_event("shutdown")
+async def shutdown_async_engine():
+    if async_engine is not None:
+        await async_engine.dispose()
+    if async_read_engine is not async_engine:
+        await async_read_engine.dispose()
+
+if settings.DB_ASYNC:
+    # registered first so they take over these GET routes from the sync handlers
+    app.include_router(courses.async_router, prefix="/courses", tags=["courses"])
+    app.include_router(course_detail.async_router, prefix="/courses", tags=["courses"])
+    app.include_router(lesson_detail.async_router, prefix="/lessons", tags=["lessons"])
+    app.include_router(recommendation.async_router, prefix="/recommendation", tags=["recommendation"])
+    app.include_router(progress.async_router, prefix="/progress", tags=["progress"])
+
 app.include_router(auth.router, prefix="/auth", tags=["auth"])
 app.include_router(courses.router, prefix="/courses", tags=["courses"])
 app.include_router(recommendation.router, prefix="/recommendation", tags=["recommendation"])
@@ -44,3 +84,4 @@ app.include_router(course_detail.router, prefix="/courses", tags=["courses"])
 app.include_router(lesson_detail.router, prefix="/lessons", tags=["lessons"])
 app.include_router(progress.router, prefix="/progress", tags=["progress"])
 app.include_router(lessons.router, prefix="/lessons", tags=["lessons"])
+app.include_router(internal.router, prefix="/internal", tags=["internal"])
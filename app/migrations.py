@@ -0,0 +1,224 @@
+"""
+Versioned schema migrations, applied in order and recorded in
+schema_migrations. `migrate()` is idempotent and safe to run from several
+processes at once (a Postgres advisory lock serialises them), so both app
+startup and `python -m app.migrations` / seed_runner call it at deploy time.
+
+Every schema change ships as its own step (a new table gets a create
+step, a new column an add_column step), never by widening the baseline,
+so a database at any earlier version is brought forward one change at a
+time. Steps are idempotent: tables are created with checkfirst, columns
+and indexes only if missing, so a step is a no-op wherever an earlier
+step (or create_all) already made that change. Index steps use CREATE
+INDEX CONCURRENTLY on Postgres so existing tables stay writable while
+they build.
+"""
+from typing import Callable, NamedTuple
+
+from sqlalchemy import Column, Integer, MetaData, Table, Text, TIMESTAMP, case, func, inspect, select, text, tuple_
+
+from . import models  # noqa: F401  (registers the tables on Base.metadata)
+from .db import Base, dialect_insert, engine
+
+_meta = MetaData()
+schema_migrations = Table(
+    "schema_migrations", _meta,
+    Column("version", Integer, primary_key=True),
+    Column("name", Text, nullable=False),
+    Column("applied_at", TIMESTAMP(timezone=True), server_default=func.now(), nullable=False),
+)
+
+BACKFILL_BATCH = 1000
+_LOCK_KEY = 7314206  # pg_advisory_lock key shared by every migrating process
+
+
+class Migration(NamedTuple):
+    version: int
+    name: str
+    run: Callable
+    transactional: bool  # False: run in autocommit (needed for CONCURRENTLY)
+
+
+MIGRATIONS: list[Migration] = []
+
+
+def migration(version: int, name: str, transactional: bool = True):
+    def register(fn):
+        assert not MIGRATIONS or version > MIGRATIONS[-1].version, "migrations must be in version order"
+        MIGRATIONS.append(Migration(version, name, fn, transactional))
+        return fn
+    return register
+
+
+# ----------------------------
+# Helpers
+# ----------------------------
+def add_column(conn, table: str, column: str, ddl: str) -> None:
+    if column not in {c["name"] for c in inspect(conn).get_columns(table)}:
+        conn.exec_driver_sql(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}")
+
+
+def create_table(conn, model) -> None:
+    model.__table__.create(conn, checkfirst=True)
+
+
+def create_index(conn, name: str, table: str, columns: str) -> None:
+    if conn.dialect.name != "postgresql":
+        conn.exec_driver_sql(f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({columns})")
+        return
+    # an interrupted concurrent build leaves an INVALID index that IF NOT EXISTS would keep
+    invalid = conn.scalar(text(
+        "SELECT NOT i.indisvalid FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid WHERE c.relname = :n"
+    ), {"n": name})
+    if invalid:
+        conn.exec_driver_sql(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
+    conn.exec_driver_sql(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON {table} ({columns})")
+
+
+# ----------------------------
+# Migrations (append only)
+# ----------------------------
+_BASELINE = (
+    models.User, models.Course, models.Module, models.Lesson, models.QuizQuestion,
+    models.UserLessonProgress, models.UserPreferences, models.RecommendationLog, models.Progress,
+)
+
+
+@migration(1, "baseline: create missing tables")
+def _baseline(conn):
+    # the tables the app had before versioned migrations; later tables have their own steps
+    Base.metadata.create_all(conn, tables=[m.__table__ for m in _BASELINE])
+
+
+@migration(2, "users.token_version")
+def _token_version(conn):
+    add_column(conn, "users", "token_version", "INTEGER NOT NULL DEFAULT 0")
+
+
+@migration(3, "hot-path indexes", transactional=False)
+def _hot_path_indexes(conn):
+    create_index(conn, "ix_modules_course_id_sort_order", "modules", "course_id, sort_order")
+    create_index(conn, "ix_lessons_module_id_sort_order", "lessons", "module_id, sort_order")
+    create_index(conn, "ix_recommendation_logs_user_id_created_at", "recommendation_logs", "user_id, created_at")
+
+
+@migration(4, "progress.attempts, progress.mastery")
+def _progress_learner_state(conn):
+    add_column(conn, "progress", "attempts", "INTEGER NOT NULL DEFAULT 0")
+    add_column(conn, "progress", "mastery", "FLOAT NOT NULL DEFAULT 0")
+
+
+@migration(5, "backfill progress from user_lesson_progress", transactional=False)
+def _backfill_progress(conn):
+    # keyset batches, each a single autocommitted upsert, so a rerun after an
+    # interruption just redoes them; taking the larger value never undoes newer writes
+    U, P = models.UserLessonProgress.__table__, models.Progress.__table__
+    insert = dialect_insert(conn)
+    after = (-1, -1)
+    while True:
+        rows = conn.execute(
+            select(U.c.user_id, U.c.lesson_id, U.c.status, U.c.mastery, U.c.attempts)
+            .where(tuple_(U.c.user_id, U.c.lesson_id) > tuple_(*after))
+            .order_by(U.c.user_id, U.c.lesson_id)
+            .limit(BACKFILL_BATCH)
+        ).all()
+        if not rows:
+            return
+        after = (rows[-1].user_id, rows[-1].lesson_id)
+        values = [
+            {
+                "user_id": r.user_id,
+                "lesson_id": r.lesson_id,
+                "status": "completed" if r.status == "completed" else "in_progress",
+                "attempts": r.attempts or 0,
+                "mastery": float(r.mastery or 0),
+            }
+            for r in rows
+            if r.status != "not_started" or r.attempts or r.mastery
+        ]
+        if not values:
+            continue
+        stmt = insert(P).values(values)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["user_id", "lesson_id"],
+            set_={
+                c: case((P.c[c] < stmt.excluded[c], stmt.excluded[c]), else_=P.c[c])
+                for c in ("attempts", "mastery")
+            },
+        )
+        conn.execute(stmt)
+
+
+@migration(6, "progress keyset index", transactional=False)
+def _progress_keyset_index(conn):
+    create_index(conn, "ix_progress_user_id_id", "progress", "user_id, id")
+
+
+@migration(7, "user_type_stats")
+def _user_type_stats(conn):
+    create_table(conn, models.UserTypeStats)
+
+
+@migration(8, "lesson_prerequisites")
+def _lesson_prerequisites(conn):
+    create_table(conn, models.LessonPrerequisite)
+
+
+@migration(9, "refresh_tokens")
+def _refresh_tokens(conn):
+    create_table(conn, models.RefreshToken)
+
+
+@migration(10, "user_preferences.explicit")
+def _explicit_preferences(conn):
+    add_column(conn, "user_preferences", "explicit", "BOOLEAN NOT NULL DEFAULT FALSE")
+
+
+# ----------------------------
+# Runner
+# ----------------------------
+def current_version(bind=engine) -> int:
+    with bind.connect() as conn:
+        if not inspect(conn).has_table("schema_migrations"):
+            return 0
+        return conn.scalar(select(func.max(schema_migrations.c.version))) or 0
+
+
+def migrate(bind=engine) -> list[int]:
+    """Apply pending migrations; returns the versions applied by this call."""
+    applied = []
+    with bind.connect().execution_options(isolation_level="AUTOCOMMIT") as lock:
+        pg = lock.dialect.name == "postgresql"
+        if pg:
+            lock.execute(text("SELECT pg_advisory_lock(:k)"), {"k": _LOCK_KEY})
+        try:
+            schema_migrations.create(lock, checkfirst=True)
+            done = set(lock.scalars(select(schema_migrations.c.version)))
+            for m in MIGRATIONS:
+                if m.version in done:
+                    continue
+                if m.transactional:
+                    with bind.begin() as conn:
+                        m.run(conn)
+                        conn.execute(schema_migrations.insert().values(version=m.version, name=m.name))
+                else:
+                    with bind.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+                        m.run(conn)
+                        conn.execute(schema_migrations.insert().values(version=m.version, name=m.name))
+                applied.append(m.version)
+        finally:
+            if pg:
+                lock.execute(text("SELECT pg_advisory_unlock(:k)"), {"k": _LOCK_KEY})
+    return applied
+
+
+def main():
+    applied = migrate()
+    if applied:
+        print(f"✅ Applied migrations {applied}, schema at version {MIGRATIONS[-1].version}")
+    else:
+        print(f"ℹ️ Schema up to date (version {current_version()})")
+
+
+if __name__ == "__main__":
+    main()
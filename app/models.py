@@ -1,6 +1,7 @@
-from sqlalchemy import Column, Integer, BigInteger, Text, ForeignKey, Numeric, Boolean, TIMESTAMP, String, Float, DateTime
+from sqlalchemy import Column, Integer, BigInteger, Text, ForeignKey, Numeric, Boolean, TIMESTAMP, String, Float, DateTime, Index
 from datetime import datetime
-from sqlalchemy.sql import func
+from sqlalchemy.sql import false, func
+from sqlalchemy.orm import deferred
 from .db import Base
 
 class User(Base):
@@ -10,6 +11,18 @@ class User(Base):
     password_hash = Column(Text, nullable=False)
     full_name = Column(Text)
     role = Column(Text, nullable=False, default="student")
+    token_version = Column(Integer, nullable=False, default=0, server_default="0")  # bump to revoke tokens
+    created_at = Column(TIMESTAMP(timezone=True), server_default=func.now(), nullable=False)
+
+class RefreshToken(Base):
+    """Rotating refresh tokens; only a sha256 of the token is stored."""
+    __tablename__ = "refresh_tokens"
+    id = Column(BigInteger, primary_key=True)
+    user_id = Column(BigInteger, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    token_hash = Column(String(64), nullable=False, unique=True, index=True)
+    family_id = Column(String(32), nullable=False, index=True)  # all rotations of one login
+    expires_at = Column(TIMESTAMP(timezone=True), nullable=False)
+    revoked_at = Column(TIMESTAMP(timezone=True))
     created_at = Column(TIMESTAMP(timezone=True), server_default=func.now(), nullable=False)
 
 class Course(Base):
@@ -26,6 +39,9 @@ class Module(Base):
     title = Column(Text, nullable=False)
     sort_order = Column(Integer, nullable=False, default=0)
 
+    # also serves plain course_id lookups; created by migrations on existing databases
+    __table_args__ = (Index("ix_modules_course_id_sort_order", "course_id", "sort_order"),)
+
 class Lesson(Base):
     __tablename__ = "lessons"
     id = Column(BigInteger, primary_key=True)
@@ -33,9 +49,17 @@ class Lesson(Base):
     title = Column(Text, nullable=False)
     lesson_type = Column(Text, nullable=False)  # text|video|interactive|quiz
     difficulty = Column(Integer, nullable=False, default=1)  # 1..3
-    content = Column(Text)
+    content = deferred(Column(Text))  # large markdown / quiz JSON; loaded only when accessed
     sort_order = Column(Integer, nullable=False, default=0)
 
+    __table_args__ = (Index("ix_lessons_module_id_sort_order", "module_id", "sort_order"),)
+
+class LessonPrerequisite(Base):
+    """Optional lesson DAG edge: `lesson_id` unlocks once `prerequisite_id` is completed."""
+    __tablename__ = "lesson_prerequisites"
+    lesson_id = Column(BigInteger, ForeignKey("lessons.id", ondelete="CASCADE"), primary_key=True)
+    prerequisite_id = Column(BigInteger, ForeignKey("lessons.id", ondelete="CASCADE"), primary_key=True)
+
 class QuizQuestion(Base):
     __tablename__ = "quiz_questions"
     id = Column(BigInteger, primary_key=True)
@@ -48,6 +72,7 @@ class QuizQuestion(Base):
     correct = Column(String(1), nullable=False)  # A/B/C/D
 
 class UserLessonProgress(Base):
+    """Legacy learner state, folded into Progress by migration 5; nothing reads or writes it anymore."""
     __tablename__ = "user_lesson_progress"
     user_id = Column(BigInteger, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
     lesson_id = Column(BigInteger, ForeignKey("lessons.id", ondelete="CASCADE"), primary_key=True)
@@ -62,6 +87,15 @@ class UserPreferences(Base):
     prefer_video = Column(Numeric(3,2), nullable=False, default=0.25)
     prefer_interactive = Column(Numeric(3,2), nullable=False, default=0.25)
     prefer_quiz = Column(Numeric(3,2), nullable=False, default=0.25)
+    explicit = Column(Boolean, nullable=False, default=False, server_default=false())  # set by the user; learning leaves it alone
+
+class UserTypeStats(Base):
+    """Running per-content-type outcome aggregates that drive UserPreferences."""
+    __tablename__ = "user_type_stats"
+    user_id = Column(BigInteger, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    lesson_type = Column(Text, primary_key=True)  # text|video|interactive|quiz
+    events = Column(Integer, nullable=False, default=0)
+    outcome_sum = Column(Float, nullable=False, default=0.0)
 
 class RecommendationLog(Base):
     __tablename__ = "recommendation_logs"
@@ -74,6 +108,8 @@ class RecommendationLog(Base):
     created_at = Column(TIMESTAMP(timezone=True), server_default=func.now(), nullable=False)
     accepted = Column(Boolean)
 
+    __table_args__ = (Index("ix_recommendation_logs_user_id_created_at", "user_id", "created_at"),)
+
 from sqlalchemy import UniqueConstraint
 
 class Progress(Base):
@@ -83,10 +119,13 @@ class Progress(Base):
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
     lesson_id = Column(Integer, ForeignKey("lessons.id"), nullable=False, index=True)
 
-    status = Column(String, nullable=False, default="completed")  # completed | started
-    score = Column(Float, nullable=True)
+    status = Column(String, nullable=False, default="completed")  # completed | in_progress
+    score = Column(Float, nullable=True)  # latest score
+    attempts = Column(Integer, nullable=False, default=0, server_default="0")
+    mastery = Column(Float, nullable=False, default=0.0, server_default="0")  # 0..1, moves toward each outcome
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     __table_args__ = (
         UniqueConstraint("user_id", "lesson_id", name="uq_progress_user_lesson"),
+        Index("ix_progress_user_id_id", "user_id", "id"),  # keyset pages of /progress/me
     )
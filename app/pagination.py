@@ -0,0 +1,46 @@
+"""
+Keyset pagination and field projection for list endpoints.
+
+Pages are ordered by primary key; the body stays a JSON array and the
+cursor for the following page (an opaque token wrapping the last id) is
+returned in the X-Next-Cursor header and a Link: rel="next" header.
+"""
+import base64
+
+from fastapi import HTTPException, Request, Response
+
+
+def encode_cursor(kind: str, last_id: int) -> str:
+    return base64.urlsafe_b64encode(f"{kind}:{last_id}".encode()).decode().rstrip("=")
+
+
+def decode_cursor(kind: str, cursor: str | None) -> int | None:
+    """Last id of the previous page, or None for the first page; 400 on a malformed or foreign cursor."""
+    if not cursor:
+        return None
+    try:
+        k, _, last = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode().partition(":")
+        if k == kind:
+            return int(last)
+    except ValueError:
+        pass
+    raise HTTPException(400, "Invalid cursor")
+
+
+def parse_fields(fields: str | None, allowed: tuple[str, ...]) -> tuple[str, ...]:
+    """Requested comma-separated fields in `allowed` order (all when omitted); 400 on unknown names."""
+    if not fields:
+        return allowed
+    wanted = {f.strip() for f in fields.split(",") if f.strip()}
+    unknown = wanted.difference(allowed)
+    if unknown:
+        raise HTTPException(400, f"Unknown fields: {', '.join(sorted(unknown))}")
+    return tuple(f for f in allowed if f in wanted)
+
+
+def set_next_cursor(request: Request, response: Response, kind: str, last_id: int | None) -> None:
+    if last_id is None:
+        return
+    cursor = encode_cursor(kind, last_id)
+    response.headers["X-Next-Cursor"] = cursor
+    response.headers["Link"] = f'<{request.url.include_query_params(cursor=cursor)}>; rel="next"'
@@ -0,0 +1,120 @@
+import bisect
+import threading
+import time
+
+from sqlalchemy import event, exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+# upper bounds (ms) of the checkout wait histogram buckets; the last one is open
+WAIT_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 5000)
+
+
+class PoolMetrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_total_ms = 0.0
+        self.wait_max_ms = 0.0
+        self.wait_counts = [0] * (len(WAIT_BUCKETS_MS) + 1)
+        self.pings = 0
+        self.ping_failures = 0
+
+    def observe_wait(self, ms: float, timed_out: bool = False) -> None:
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            self.wait_total_ms += ms
+            self.wait_max_ms = max(self.wait_max_ms, ms)
+            self.wait_counts[bisect.bisect_left(WAIT_BUCKETS_MS, ms)] += 1
+
+    def snapshot(self, pool) -> dict:
+        """Stats for `pool`; the checkout wait fields only when the pool records them."""
+        with self._lock:
+            out = {}
+            if isinstance(pool, _CheckoutTiming):
+                hist = {f"le_{b}ms": n for b, n in zip(WAIT_BUCKETS_MS, self.wait_counts)}
+                hist["inf"] = self.wait_counts[-1]
+                out.update({
+                    "checkouts": self.checkouts,
+                    "timeouts": self.timeouts,
+                    "wait_mean_ms": self.wait_total_ms / max(1, self.checkouts + self.timeouts),
+                    "wait_max_ms": self.wait_max_ms,
+                    "wait_histogram": hist,
+                })
+            out["pre_pings"] = self.pings
+            out["pre_ping_failures"] = self.ping_failures
+        if isinstance(pool, QueuePool):
+            out.update({
+                "size": pool.size(),
+                "checked_out": pool.checkedout(),
+                "checked_in": pool.checkedin(),
+                "overflow": pool.overflow(),
+            })
+        out["status"] = pool.status()
+        return out
+
+
+# one per engine, so the primary, the replica and their async counterparts report separately
+pool_metrics = PoolMetrics()
+read_pool_metrics = PoolMetrics()
+async_pool_metrics = PoolMetrics()
+async_read_pool_metrics = PoolMetrics()
+
+
+class _CheckoutTiming:
+    """Pool mixin that records how long each checkout waited for a connection into `metrics`."""
+
+    metrics: PoolMetrics
+
+    @classmethod
+    def recording_to(cls, metrics: PoolMetrics) -> type:
+        # a subclass rather than an instance attribute: pool.recreate() (engine.dispose) builds a new
+        # pool from the class and keeps recording to the same metrics
+        return type(cls.__name__, (cls,), {"metrics": metrics})
+
+    def _do_get(self):
+        t0 = time.perf_counter()
+        try:
+            conn = super()._do_get()
+        except exc.TimeoutError:
+            self.metrics.observe_wait((time.perf_counter() - t0) * 1e3, timed_out=True)
+            raise
+        self.metrics.observe_wait((time.perf_counter() - t0) * 1e3)
+        return conn
+
+
+class InstrumentedQueuePool(_CheckoutTiming, QueuePool):
+    pass
+
+
+class InstrumentedAsyncQueuePool(_CheckoutTiming, AsyncAdaptedQueuePool):
+    pass
+
+
+def install_idle_ping(engine, idle_seconds: float, metrics: PoolMetrics) -> None:
+    """
+    Cheaper alternative to pool_pre_ping: only connections that sat idle in
+    the pool for `idle_seconds` or more are pinged on checkout. A failed ping
+    makes the pool discard the connection and retry with a fresh one.
+    """
+    @event.listens_for(engine, "checkin")
+    def _on_checkin(dbapi_conn, record):
+        record.info["checked_in_at"] = time.monotonic()
+
+    @event.listens_for(engine, "checkout")
+    def _on_checkout(dbapi_conn, record, proxy):
+        since = record.info.get("checked_in_at")
+        if since is None or time.monotonic() - since < idle_seconds:
+            return
+        metrics.pings += 1
+        cur = dbapi_conn.cursor()
+        try:
+            cur.execute("SELECT 1")
+        except Exception:
+            metrics.ping_failures += 1
+            raise exc.DisconnectionError()
+        finally:
+            cur.close()
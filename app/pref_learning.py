@@ -0,0 +1,128 @@
+"""
+Learns UserPreferences.prefer_* from learner outcomes.
+
+Each completion / quiz result adds one outcome in [0, 1] to a running
+(events, outcome_sum) aggregate per (user, lesson_type) in user_type_stats,
+so an update touches a constant number of rows. A type's affinity is the
+smoothed mean outcome, and the four affinities are normalised into weights
+(equal affinities give the 0.25 defaults).
+
+`python -m app.pref_learning` rebuilds every user's aggregates and weights
+from the progress table in one pass; run it periodically (e.g. nightly).
+It runs in its own process and cannot reach the API workers' recommendation
+caches, so rankings computed from the old weights are served for at most
+REC_CACHE_TTL_SECONDS after it finishes.
+
+Weights a user set through PUT /recommendation/preferences are explicit
+and win: neither path overwrites them, though their stats keep counting.
+"""
+from sqlalchemy import case, func
+from sqlalchemy.orm import Session
+
+from . import models
+from .db import SessionLocal, dialect_insert
+from .preferences import PREF_FIELDS, save_preferences
+
+TYPES = tuple(f.removeprefix("prefer_") for f in PREF_FIELDS)
+PRIOR = 0.5         # assumed outcome for a type with no history
+PRIOR_WEIGHT = 2.0  # how many pseudo-events the prior is worth
+CHUNK = 1000        # rows per multi-row INSERT in recompute_all
+
+
+def weights_from_stats(stats: dict[str, tuple[int, float]]) -> dict[str, float]:
+    """{lesson_type: (events, outcome_sum)} -> {prefer_<type>: weight}, weights summing to ~1."""
+    affinity = {}
+    for t in TYPES:
+        events, total = stats.get(t, (0, 0.0))
+        affinity[t] = (total + PRIOR * PRIOR_WEIGHT) / (events + PRIOR_WEIGHT)
+    norm = sum(affinity.values()) or 1.0
+    return {f"prefer_{t}": round(affinity[t] / norm, 2) for t in TYPES}
+
+
+def record_outcome(db: Session, user_id: int, lesson_type: str | None, outcome: float, commit: bool = True) -> None:
+    """
+    O(1) online update after a completion or quiz submission. With
+    `commit=False` it joins the caller's transaction, which then commits
+    and invalidates the user's cached recommendations.
+    """
+    lt = (lesson_type or "").lower()
+    if lt not in TYPES:
+        return
+    outcome = max(0.0, min(1.0, float(outcome)))
+
+    T = models.UserTypeStats
+    insert = dialect_insert(db)
+    db.execute(
+        insert(T)
+        .values(user_id=user_id, lesson_type=lt, events=1, outcome_sum=outcome)
+        .on_conflict_do_update(
+            index_elements=["user_id", "lesson_type"],
+            set_={"events": T.events + 1, "outcome_sum": T.outcome_sum + outcome},
+        )
+    )
+    rows = db.query(T.lesson_type, T.events, T.outcome_sum).filter(T.user_id == user_id).all()
+    save_preferences(db, user_id, weights_from_stats({r[0]: (r[1], r[2]) for r in rows}), commit=commit, learned=True)
+    if commit:
+        db.commit()
+
+
+def recompute_all(db: Session) -> int:
+    """
+    Rebuild user_type_stats and the learned weights of every user without
+    explicit ones from progress history, with one aggregate query. Returns
+    the number of users whose weights were rebuilt.
+
+    Like the online path this counts one event per attempt. progress keeps
+    only the latest score, so each of a row's attempts is credited with that
+    latest outcome; a learner who failed a quiz twice and then passed it
+    weighs more positive here than online, and the nightly rebuild resets
+    the aggregates to this estimate.
+    """
+    P, L = models.Progress, models.Lesson
+    outcome = func.coalesce(P.score, case((P.status == "completed", 1.0), else_=0.0))
+    attempts = case((P.attempts > 0, P.attempts), else_=1)  # rows backfilled without attempts still count once
+    agg = (
+        db.query(P.user_id, func.lower(L.lesson_type), func.sum(attempts), func.sum(attempts * outcome))
+        .join(L, L.id == P.lesson_id)
+        .group_by(P.user_id, func.lower(L.lesson_type))
+        .all()
+    )
+
+    per_user: dict[int, dict[str, tuple[int, float]]] = {}
+    stat_rows = []
+    for user_id, lt, events, total in agg:
+        if lt not in TYPES:
+            continue
+        per_user.setdefault(user_id, {})[lt] = (int(events), float(total or 0.0))
+        stat_rows.append({"user_id": user_id, "lesson_type": lt, "events": int(events), "outcome_sum": float(total or 0.0)})
+
+    db.query(models.UserTypeStats).delete(synchronize_session=False)
+    if stat_rows:
+        db.execute(models.UserTypeStats.__table__.insert(), stat_rows)
+
+    insert = dialect_insert(db)
+    UP = models.UserPreferences
+    pref_rows = [{"user_id": uid, **weights_from_stats(stats)} for uid, stats in per_user.items()]
+    updated = 0
+    for i in range(0, len(pref_rows), CHUNK):
+        stmt = insert(UP).values(pref_rows[i:i + CHUNK])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["user_id"], set_={f: stmt.excluded[f] for f in PREF_FIELDS}, where=~UP.explicit,
+        )
+        updated += db.execute(stmt).rowcount
+
+    db.commit()
+    return updated
+
+
+def main():
+    db = SessionLocal()
+    try:
+        n = recompute_all(db)
+        print(f"✅ Recomputed preferences for {n} users")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from . import models
+from .db import dialect_insert
+from .rec_cache import rec_cache
+from .db_routing import db_routing
+
+PREF_FIELDS = ("prefer_text", "prefer_video", "prefer_interactive", "prefer_quiz")
+
+
+def default_preferences(user_id: int) -> models.UserPreferences:
+    """Transient (never added to a session) row holding the column defaults."""
+    cols = models.UserPreferences.__table__.c
+    return models.UserPreferences(user_id=user_id, explicit=False, **{f: cols[f].default.arg for f in PREF_FIELDS})
+
+
+def get_preferences(db: Session, user_id: int) -> models.UserPreferences:
+    """Stored preferences, or in-memory defaults when the user has none yet. Never writes."""
+    prefs = db.query(models.UserPreferences).filter_by(user_id=user_id).first()
+    return prefs if prefs is not None else default_preferences(user_id)
+
+
+async def get_preferences_async(adb, user_id: int) -> models.UserPreferences:
+    res = await adb.execute(select(models.UserPreferences).where(models.UserPreferences.user_id == user_id))
+    prefs = res.scalars().first()
+    return prefs if prefs is not None else default_preferences(user_id)
+
+
+def save_preferences(
+    db: Session, user_id: int, values: dict, current=None, commit: bool = True, learned: bool = False,
+) -> bool:
+    """
+    Persist changed weights with a single INSERT .. ON CONFLICT DO UPDATE.
+    Returns False (and writes nothing) when nothing actually changes. Weights
+    the user sets mark the row explicit, and learned weights (`learned=True`)
+    never replace explicit ones. With `commit=False` the caller commits and
+    then invalidates the user's cached recommendations itself.
+    """
+    if current is None:
+        current = get_preferences(db, user_id)
+    if learned and current.explicit:
+        return False
+    changes = {
+        f: round(float(v), 2)
+        for f, v in values.items()
+        if f in PREF_FIELDS and v is not None and round(float(v), 2) != round(float(getattr(current, f)), 2)
+    }
+    if not learned and not current.explicit and any(values.get(f) is not None for f in PREF_FIELDS):
+        changes["explicit"] = True
+    if not changes:
+        return False
+
+    row = {f: float(getattr(current, f)) for f in PREF_FIELDS}
+    row.update(changes)  # explicit stays at its default unless set above
+    UP = models.UserPreferences
+    insert = dialect_insert(db)
+    stmt = (
+        insert(UP)
+        .values(user_id=user_id, **row)
+        # learned weights re-check explicit in the statement: a PUT may have committed since `current` was read
+        .on_conflict_do_update(index_elements=["user_id"], set_=changes, where=~UP.explicit if learned else None)
+    )
+    if not db.execute(stmt).rowcount:
+        return False
+    if commit:
+        db.commit()
+        rec_cache.invalidate_user(user_id)
+        db_routing.wrote(user_id)
+    return True
@@ -0,0 +1,95 @@
+import threading
+from collections import OrderedDict
+
+from .catalog import CatalogSnapshot, LessonRow
+from .config import settings
+
+
+class _UserFrontier:
+    __slots__ = ("snap", "completed", "courses")
+
+    def __init__(self, snap: CatalogSnapshot, completed: set[int]):
+        self.snap = snap
+        self.completed = completed
+        self.courses: dict[int, set[int]] = {}  # course_id -> unlocked, not yet completed
+
+
+class FrontierStore:
+    """
+    Per-user set of unlocked lessons (all prerequisites completed, lesson
+    itself not completed), built once from the user's progress and then
+    updated incrementally as lessons are completed.
+
+    Every read reconciles the cached state with the progress the caller just
+    loaded: lessons completed elsewhere (another worker, a replica catching
+    up) are applied like `complete`, and a lesson we hold as completed that
+    no longer is forces a rebuild, so the frontier never lags `prog`.
+    Bounded LRU over users.
+    """
+
+    def __init__(self, max_users: int):
+        self.max_users = max_users
+        self._users: OrderedDict[int, _UserFrontier] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def unlocked(self, snap: CatalogSnapshot, user_id: int, course_id: int, prog: dict) -> list[LessonRow]:
+        """Unlocked lessons of a course in course order; `prog` is {lesson_id: progress row}."""
+        course = snap.course(course_id)
+        if not course:
+            return []
+
+        done = {lid for lid, p in prog.items() if getattr(p, "status", None) == "completed"}
+        with self._lock:
+            st = self._users.get(user_id)
+            if st is not None and st.snap is snap and st.completed <= done:
+                for lid in done - st.completed:
+                    self._complete(st, lid)
+            else:
+                st = _UserFrontier(snap, done)
+                self._users[user_id] = st
+                while len(self._users) > self.max_users:
+                    self._users.popitem(last=False)
+            self._users.move_to_end(user_id)
+
+            frontier = st.courses.get(course_id)
+            if frontier is None:
+                frontier = {
+                    L.id for L in course.lessons
+                    if L.id not in done and all(p in done for p in snap.prereqs.get(L.id, ()))
+                }
+                st.courses[course_id] = frontier
+            ids = sorted(frontier, key=snap.position.__getitem__)
+
+        return [snap.lessons[lid] for lid in ids]
+
+    def complete(self, user_id: int, lesson_id: int) -> None:
+        """O(dependents) update after `lesson_id` was completed."""
+        with self._lock:
+            st = self._users.get(user_id)
+            if st is not None and lesson_id not in st.completed:
+                self._complete(st, lesson_id)
+
+    @staticmethod
+    def _complete(st: _UserFrontier, lesson_id: int) -> None:
+        snap = st.snap
+        st.completed.add(lesson_id)
+        L = snap.lesson(lesson_id)
+        if L is not None and L.course_id in st.courses:
+            st.courses[L.course_id].discard(lesson_id)
+        for dep in snap.dependents.get(lesson_id, ()):
+            D = snap.lesson(dep)
+            frontier = st.courses.get(D.course_id) if D else None
+            if frontier is None or dep in st.completed:
+                continue
+            if all(p in st.completed for p in snap.prereqs.get(dep, ())):
+                frontier.add(dep)
+
+    def uncomplete(self, user_id: int, lesson_id: int) -> None:
+        """A lesson went back to not-completed (e.g. a failed quiz retake): rebuild lazily."""
+        with self._lock:
+            st = self._users.get(user_id)
+            if st is not None and lesson_id in st.completed:
+                del self._users[user_id]
+
+
+frontiers = FrontierStore(settings.FRONTIER_MAX_USERS)
@@ -0,0 +1,151 @@
+import threading
+import time
+from collections import OrderedDict
+
+from fastapi import HTTPException
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from . import models
+from .config import settings
+from .db import SessionLocal
+from .security import decode_claims
+from .refresh_tokens import revoke_user
+
+
+class Principal:
+    """
+    The authenticated caller, built from signed token claims. Handlers that
+    only need the id/role never touch the users table; `load_user` fetches
+    the full row on demand.
+    """
+
+    __slots__ = ("id", "role", "token_version", "_user")
+
+    def __init__(self, id: int, role: str, token_version: int):
+        self.id = id
+        self.role = role
+        self.token_version = token_version
+        self._user = None
+
+    def load_user(self, db: Session) -> models.User:
+        if self._user is None:
+            self._user = db.get(models.User, self.id)
+            if self._user is None:
+                raise HTTPException(401, "User not found")
+        return self._user
+
+
+class UserCache:
+    """user_id -> (token_version, role); LRU + TTL, invalidated explicitly on changes."""
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl = ttl_seconds
+        self._data: OrderedDict[int, tuple[float, int, str]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id: int) -> tuple[int, str] | None:
+        with self._lock:
+            item = self._data.get(user_id)
+            if item is None:
+                return None
+            if item[0] <= time.monotonic():
+                del self._data[user_id]
+                return None
+            self._data.move_to_end(user_id)
+            return item[1], item[2]
+
+    def put(self, user_id: int, token_version: int, role: str) -> None:
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._data[user_id] = (time.monotonic() + self.ttl, token_version, role)
+            self._data.move_to_end(user_id)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def invalidate(self, user_id: int) -> None:
+        with self._lock:
+            self._data.pop(user_id, None)
+
+
+user_cache = UserCache(settings.USER_CACHE_MAX_ENTRIES, settings.USER_CACHE_TTL_SECONDS)
+
+
+def user_state(user_id: int) -> tuple[int, str] | None:
+    state = user_cache.get(user_id)
+    if state is not None:
+        return state
+    db = SessionLocal()
+    try:
+        row = (
+            db.query(models.User.token_version, models.User.role)
+            .filter(models.User.id == user_id)
+            .first()
+        )
+    finally:
+        db.close()
+    if row is None:
+        return None
+    state = (int(row[0] or 0), row[1] or "student")
+    user_cache.put(user_id, *state)
+    return state
+
+
+async def user_state_async(adb, user_id: int) -> tuple[int, str] | None:
+    state = user_cache.get(user_id)
+    if state is not None:
+        return state
+    row = (await adb.execute(
+        select(models.User.token_version, models.User.role).where(models.User.id == user_id)
+    )).first()
+    if row is None:
+        return None
+    state = (int(row[0] or 0), row[1] or "student")
+    user_cache.put(user_id, *state)
+    return state
+
+
+def _claims_from_header(authorization: str | None) -> dict:
+    if not authorization or not authorization.lower().startswith("bearer "):
+        raise HTTPException(401, "Missing token")
+    claims = decode_claims(authorization.split(" ", 1)[1])
+    if not claims:
+        raise HTTPException(401, "Invalid token")
+    return claims
+
+
+def _principal(claims: dict, state: tuple[int, str] | None) -> Principal:
+    if state is None:
+        raise HTTPException(401, "User not found")
+    token_version, role = state
+    if claims["tv"] != token_version:
+        raise HTTPException(401, "Token revoked")
+    return Principal(int(claims["sub"]), role, token_version)
+
+
+def user_id_from_header(authorization: str | None) -> int:
+    """User id from a verified token, without the revocation check (for routing reads only)."""
+    return int(_claims_from_header(authorization)["sub"])
+
+
+def principal_from_header(authorization: str | None) -> Principal:
+    claims = _claims_from_header(authorization)
+    return _principal(claims, user_state(int(claims["sub"])))
+
+
+async def principal_from_header_async(authorization: str | None, adb) -> Principal:
+    """principal_from_header for async handlers; a cache miss queries through `adb`."""
+    claims = _claims_from_header(authorization)
+    return _principal(claims, await user_state_async(adb, int(claims["sub"])))
+
+
+def revoke_tokens(db: Session, user_id: int) -> None:
+    """Invalidate every access and refresh token issued to the user so far."""
+    db.query(models.User).filter(models.User.id == user_id).update(
+        {models.User.token_version: models.User.token_version + 1}, synchronize_session=False,
+    )
+    revoke_user(db, user_id)
+    db.commit()
+    user_cache.invalidate(user_id)
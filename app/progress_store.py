@@ -0,0 +1,62 @@
+"""
+The one store of learner state: a `progress` row per (user, lesson) with
+status, score, attempts and mastery. Every write is a single
+INSERT .. ON CONFLICT .. RETURNING, and readers (the recommender, /progress)
+load a user's rows through the user_id index.
+"""
+from datetime import datetime
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from . import models
+from .db import dialect_insert
+
+MASTERY_RATE = 0.4  # each outcome moves mastery this far toward it (stays within 0..1)
+
+
+def get_progress(db: Session, user_id: int) -> dict:
+    """{lesson_id: progress row} for one user."""
+    return {p.lesson_id: p for p in db.query(models.Progress).filter_by(user_id=user_id)}
+
+
+async def get_progress_async(adb, user_id: int) -> dict:
+    res = await adb.execute(select(models.Progress).where(models.Progress.user_id == user_id))
+    return {p.lesson_id: p for p in res.scalars()}
+
+
+def record_attempt(
+    db: Session, user_id: int, lesson_id: int, status: str, outcome: float,
+    score: float | None = None, commit: bool = True,
+):
+    """
+    Count one attempt at a lesson: set its status, keep `score` (None keeps
+    the stored one), bump attempts and move mastery toward `outcome` in
+    0..1, in one statement. Returns the stored row; commits unless the
+    caller is part of a larger unit of work (`commit=False`).
+    """
+    P = models.Progress
+    outcome = max(0.0, min(1.0, float(outcome)))
+    now = datetime.utcnow()
+    set_ = {
+        "status": status,
+        "attempts": P.attempts + 1,
+        "mastery": P.mastery * (1 - MASTERY_RATE) + outcome * MASTERY_RATE,
+        "updated_at": now,
+    }
+    if score is not None:
+        set_["score"] = score
+    insert = dialect_insert(db)
+    stmt = (
+        insert(P)
+        .values(
+            user_id=user_id, lesson_id=lesson_id, status=status, score=score,
+            attempts=1, mastery=outcome * MASTERY_RATE, updated_at=now,
+        )
+        .on_conflict_do_update(index_elements=["user_id", "lesson_id"], set_=set_)
+        .returning(*P.__table__.c)
+    )
+    row = db.execute(stmt).one()
+    if commit:
+        db.commit()
+    return row
@@ -0,0 +1,120 @@
+"""
+Token-bucket throttling for /auth/login, checked before any bcrypt work.
+
+Backends implement `take(key, rate, burst) -> retry_after_seconds` (0 when
+allowed). The default keeps buckets in process memory with a fixed key
+budget; set LOGIN_RATE_BACKEND to "package.module:ClassName" to plug in a
+shared store (e.g. Redis) for multi-worker deployments.
+
+The per-IP bucket is keyed on `client_ip`, which honours X-Forwarded-For
+only from TRUSTED_PROXIES, so a proxy in front of the app does not put
+every client into one bucket and nobody can pick their own key by sending
+the header directly.
+"""
+import importlib
+import ipaddress
+import threading
+import time
+from collections import OrderedDict
+
+from fastapi import HTTPException, Request
+
+from .config import settings
+
+
+class RateLimitBackend:
+    def take(self, key: str, rate: float, burst: float) -> float:
+        """Consume one token from `key`'s bucket; return 0 if allowed, else seconds until one is available."""
+        raise NotImplementedError
+
+
+class InMemoryBackend(RateLimitBackend):
+    """
+    Buckets in an LRU capped at `max_keys`, so memory stays constant. An idle
+    bucket refills to full, which is the same as having no entry, so
+    dropping the least recently used keys never lets anyone through early
+    unless the table is under pressure from more than `max_keys` clients.
+    """
+
+    def __init__(self, max_keys: int):
+        self.max_keys = max_keys
+        self._buckets: OrderedDict[str, tuple[float, float]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key: str, rate: float, burst: float) -> float:
+        now = time.monotonic()
+        with self._lock:
+            tokens, last = self._buckets.get(key, (burst, now))
+            tokens = min(burst, tokens + (now - last) * rate)
+            if tokens < 1.0:
+                self._buckets[key] = (tokens, now)
+                self._buckets.move_to_end(key)
+                return (1.0 - tokens) / rate
+            self._buckets[key] = (tokens - 1.0, now)
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+            return 0.0
+
+
+def _make_backend(spec: str) -> RateLimitBackend:
+    if spec == "memory":
+        return InMemoryBackend(settings.LOGIN_RATE_MAX_KEYS)
+    module, _, name = spec.partition(":")
+    return getattr(importlib.import_module(module), name)()
+
+
+def _parse_networks(spec: str) -> tuple:
+    return tuple(ipaddress.ip_network(s.strip(), strict=False) for s in spec.split(",") if s.strip())
+
+
+_trusted = _parse_networks(settings.TRUSTED_PROXIES)
+
+
+def _is_trusted(host: str) -> bool:
+    try:
+        addr = ipaddress.ip_address(host)
+    except ValueError:
+        return False
+    return any(addr in net for net in _trusted)
+
+
+def client_ip(request: Request) -> str | None:
+    """
+    Address of the client that sent `request`: walk X-Forwarded-For from the
+    right while the hop that appended it is a trusted proxy, and stop at the
+    first address we cannot vouch for.
+    """
+    host = request.client.host if request.client else None
+    if host is None or not _is_trusted(host):
+        return host
+    hops = [h.strip() for v in request.headers.getlist("x-forwarded-for") for h in v.split(",")]
+    for hop in reversed(hops):
+        if not hop:
+            continue
+        host = hop
+        if not _is_trusted(hop):
+            break
+    return host
+
+
+class LoginThrottle:
+    def __init__(self, backend: RateLimitBackend):
+        self.backend = backend
+        self.rejected = 0
+
+    def check(self, ip: str | None, email: str) -> None:
+        """Raise 429 if either the client IP or the account is over its budget."""
+        wait = self.backend.take(f"ip:{ip or '-'}", settings.LOGIN_IP_PER_MINUTE / 60.0, settings.LOGIN_IP_BURST)
+        if not wait:
+            wait = self.backend.take(
+                f"acct:{email.strip().lower()}", settings.LOGIN_ACCOUNT_PER_MINUTE / 60.0, settings.LOGIN_ACCOUNT_BURST,
+            )
+        if wait:
+            self.rejected += 1
+            raise HTTPException(
+                429, "Too many login attempts", headers={"Retry-After": str(max(1, int(wait + 0.999)))},
+            )
+
+
+login_throttle = LoginThrottle(_make_backend(settings.LOGIN_RATE_BACKEND))
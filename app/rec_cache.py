@@ -0,0 +1,121 @@
+import threading
+import time
+from collections import OrderedDict
+
+from .config import settings
+
+
+class RecommendationCache:
+    """
+    LRU + TTL cache of recommendation results keyed by
+    (user_id, course_id, mode, k, catalog_version).
+
+    Bounded by `max_entries`; every key is also indexed by user so progress
+    or preference writes can drop exactly that user's entries.
+
+    A result computed from state read before an invalidation must not be
+    stored after it, so each invalidation also bumps the user's generation:
+    callers read `generation(user_id)` before loading, pass it to `put`, and
+    the put is skipped if it changed meanwhile. Generations of the most
+    recently invalidated users are kept; older ones fall back to a floor
+    that only grows, which at worst skips a put.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl = ttl_seconds
+        self._data: OrderedDict[tuple, tuple[float, object]] = OrderedDict()
+        self._by_user: dict[int, set[tuple]] = {}
+        self._gen: OrderedDict[int, int] = OrderedDict()
+        self._gen_floor = 0
+        self._tick = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+        self.stale_puts = 0
+
+    def get(self, key: tuple):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                self.misses += 1
+                return None
+            expires, value = item
+            if expires <= time.monotonic():
+                self._drop(key)
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def generation(self, user_id: int) -> int:
+        with self._lock:
+            return self._gen.get(user_id, self._gen_floor)
+
+    def put(self, key: tuple, value, gen: int | None = None) -> None:
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            if gen is not None and self._gen.get(key[0], self._gen_floor) != gen:
+                self.stale_puts += 1  # invalidated while the value was being computed
+                return
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            self._by_user.setdefault(key[0], set()).add(key)
+            while len(self._data) > self.max_entries:
+                old, _ = self._data.popitem(last=False)
+                self._unindex(old)
+                self.evictions += 1
+
+    def invalidate_user(self, user_id: int) -> None:
+        with self._lock:
+            keys = self._by_user.pop(user_id, ())
+            for key in keys:
+                self._data.pop(key, None)
+            self.invalidations += len(keys)
+            self._tick += 1
+            self._gen[user_id] = self._tick
+            self._gen.move_to_end(user_id)
+            while len(self._gen) > max(self.max_entries, 1):
+                _, old = self._gen.popitem(last=False)
+                self._gen_floor = max(self._gen_floor, old)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self._by_user.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._data),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": (self.hits / lookups) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+                "stale_puts": self.stale_puts,
+            }
+
+    def _drop(self, key: tuple) -> None:
+        self._data.pop(key, None)
+        self._unindex(key)
+
+    def _unindex(self, key: tuple) -> None:
+        keys = self._by_user.get(key[0])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._by_user[key[0]]
+
+
+rec_cache = RecommendationCache(settings.REC_CACHE_MAX_ENTRIES, settings.REC_CACHE_TTL_SECONDS)
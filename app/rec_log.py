@@ -0,0 +1,188 @@
+import logging
+import queue
+import threading
+from datetime import datetime, timezone
+
+from sqlalchemy import func, insert, select, update
+
+from . import models
+from .config import settings
+from .db import engine
+
+log = logging.getLogger(__name__)
+
+
+class RecommendationLogWriter:
+    """
+    Buffers served recommendations in a bounded in-process queue and writes
+    them to recommendation_logs with multi-row inserts from a background
+    thread, flushing every `batch_size` rows or `flush_seconds`, whichever
+    comes first. record() never blocks: when the queue is full the row is
+    dropped and counted.
+
+    accept() must not wait for the queue to drain, so rows are counted per
+    (user, lesson) until they are written: with none outstanding it marks
+    the row directly, otherwise it leaves an accept intent that the writer
+    applies once the rows queued before it are inserted.
+    """
+
+    def __init__(self, batch_size: int, flush_seconds: float, max_queue: int):
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        self._q: queue.Queue[dict] = queue.Queue(maxsize=max_queue)
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._flush_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self._pending: dict[tuple[int, int], int] = {}  # queued or in-flight rows per (user, lesson)
+        self._accepts: dict[tuple[int, int], tuple[int, datetime]] = {}  # -> (rows still to write, accepted at)
+        self._thread: threading.Thread | None = None
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+
+    def record(self, user_id: int, lesson_id: int, mode: str, score: float | None, reason: str | None) -> None:
+        row = {
+            "user_id": user_id,
+            "recommended_lesson_id": lesson_id,
+            "mode": mode,
+            "score": round(float(score or 0.0), 3),
+            "reason": reason,
+            "created_at": datetime.now(timezone.utc),
+        }
+        key = (user_id, lesson_id)
+        with self._lock:
+            self._pending[key] = self._pending.get(key, 0) + 1
+        try:
+            self._q.put_nowait(row)
+        except queue.Full:
+            self.dropped += 1
+            # this row was queued after any accept intent for the pair, so it settles none:
+            # nothing to write from the request path
+            with self._lock:
+                self._release(key)
+            return
+        if self._q.qsize() >= self.batch_size:
+            self._wake.set()
+
+    def accept(self, user_id: int, lesson_id: int) -> bool:
+        """
+        Mark the latest unanswered recommendation of `lesson_id` to `user_id`
+        as accepted; False if there is none.
+        """
+        key = (user_id, lesson_id)
+        at = datetime.now(timezone.utc)
+        with self._lock:
+            pending = self._pending.get(key, 0)
+            if pending:
+                self._accepts[key] = (pending, at)
+                return True
+        with engine.begin() as conn:
+            return self._mark_accepted(conn, user_id, lesson_id, at)
+
+    def start(self) -> None:
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="rec-log-writer", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 10.0) -> None:
+        """Stop the background thread and drain whatever is still queued."""
+        self._stop.set()
+        self._wake.set()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+        self.flush()
+
+    def flush(self) -> None:
+        with self._flush_lock:
+            while True:
+                batch = []
+                while len(batch) < self.batch_size:
+                    try:
+                        batch.append(self._q.get_nowait())
+                    except queue.Empty:
+                        break
+                if not batch:
+                    return
+                self._write(batch)
+
+    def stats(self) -> dict:
+        return {
+            "queued": self._q.qsize(),
+            "written": self.written,
+            "dropped": self.dropped,
+            "failed": self.failed,
+            "pending_accepts": len(self._accepts),
+        }
+
+    def _write(self, batch: list[dict]) -> None:
+        try:
+            with engine.begin() as conn:
+                conn.execute(insert(models.RecommendationLog.__table__), batch)
+            self.written += len(batch)
+        except Exception:
+            self.failed += len(batch)
+            log.exception("recommendation log flush failed (%d rows dropped)", len(batch))
+        self._apply(self._settle([(r["user_id"], r["recommended_lesson_id"]) for r in batch]))
+
+    def _settle(self, keys: list[tuple[int, int]]) -> list[tuple[tuple[int, int], datetime]]:
+        """Count `keys` as no longer outstanding; return the accept intents that became due."""
+        due = []
+        with self._lock:
+            for key in keys:
+                self._release(key)
+                intent = self._accepts.get(key)
+                if intent is None:
+                    continue
+                left, at = intent
+                if left <= 1:
+                    del self._accepts[key]
+                    due.append((key, at))
+                else:
+                    self._accepts[key] = (left - 1, at)
+        return due
+
+    def _release(self, key: tuple[int, int]) -> None:
+        n = self._pending.pop(key, 1) - 1
+        if n:
+            self._pending[key] = n
+
+    def _apply(self, due: list[tuple[tuple[int, int], datetime]]) -> None:
+        if not due:
+            return
+        try:
+            with engine.begin() as conn:
+                for (user_id, lesson_id), at in due:
+                    self._mark_accepted(conn, user_id, lesson_id, at)
+        except Exception:
+            log.exception("applying %d recommendation accepts failed", len(due))
+
+    @staticmethod
+    def _mark_accepted(conn, user_id: int, lesson_id: int, at: datetime) -> bool:
+        # latest unanswered row served before the accept
+        R = models.RecommendationLog.__table__
+        latest = (
+            select(func.max(R.c.id))
+            .where(
+                R.c.user_id == user_id,
+                R.c.recommended_lesson_id == lesson_id,
+                R.c.accepted.is_(None),
+                R.c.created_at <= at,
+            )
+            .scalar_subquery()
+        )
+        return bool(conn.execute(update(R).where(R.c.id == latest).values(accepted=True)).rowcount)
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self._wake.wait(self.flush_seconds)
+            self._wake.clear()
+            self.flush()
+
+
+rec_log = RecommendationLogWriter(
+    settings.REC_LOG_BATCH_SIZE, settings.REC_LOG_FLUSH_SECONDS, settings.REC_LOG_QUEUE_MAX,
+)
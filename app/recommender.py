@@ -1,14 +1,67 @@
-def score_candidate(mastery: float, attempts: int, pref_weight: float, difficulty: int) -> tuple[float, str]:
-    need = 1.0 - mastery
-    struggle = min(attempts / 3.0, 1.0)
+import heapq
+
+import numpy as np
+
 
+def _dmatch(mastery: float, difficulty: int) -> float:
     if mastery < 0.40:
-        dmatch = 1.0 if difficulty == 1 else 0.3
+        return 1.0 if difficulty == 1 else 0.3
     elif mastery < 0.75:
-        dmatch = 1.0 if difficulty == 2 else 0.6
+        return 1.0 if difficulty == 2 else 0.6
     else:
-        dmatch = 1.0 if difficulty == 3 else 0.6
+        return 1.0 if difficulty == 3 else 0.6
+
+
+def format_reason(mastery: float, attempts: int, pref_weight: float, difficulty: int) -> str:
+    return (
+        f"need={1.0 - mastery:.2f}, pref={pref_weight:.2f}, attempts={attempts}, "
+        f"dmatch={_dmatch(mastery, difficulty):.2f}"
+    )
+
+
+def score_candidate(mastery: float, attempts: int, pref_weight: float, difficulty: int) -> tuple[float, str]:
+    need = 1.0 - mastery
+    struggle = min(attempts / 3.0, 1.0)
+    dmatch = _dmatch(mastery, difficulty)
 
     score = 0.45*need + 0.20*pref_weight + 0.20*(1.0 - struggle) + 0.15*dmatch
     reason = f"need={need:.2f}, pref={pref_weight:.2f}, attempts={attempts}, dmatch={dmatch:.2f}"
     return score, reason
+
+
+def score_batch(mastery, attempts, pref_weight, difficulty) -> tuple[np.ndarray, int]:
+    """
+    Vectorised score_candidate over equal-length arrays.
+    Returns (scores, index of the best candidate); ties go to the first
+    candidate, like the sequential loop in next_lesson.
+    """
+    mastery = np.asarray(mastery, dtype=np.float64)
+    attempts = np.asarray(attempts, dtype=np.float64)
+    pref_weight = np.asarray(pref_weight, dtype=np.float64)
+    difficulty = np.asarray(difficulty, dtype=np.int64)
+    if mastery.size == 0:
+        return mastery, -1
+
+    need = 1.0 - mastery
+    struggle = np.minimum(attempts / 3.0, 1.0)
+    dmatch = np.where(
+        mastery < 0.40,
+        np.where(difficulty == 1, 1.0, 0.3),
+        np.where(
+            mastery < 0.75,
+            np.where(difficulty == 2, 1.0, 0.6),
+            np.where(difficulty == 3, 1.0, 0.6),
+        ),
+    )
+
+    scores = 0.45*need + 0.20*pref_weight + 0.20*(1.0 - struggle) + 0.15*dmatch
+    return scores, int(np.argmax(scores))
+
+
+def top_k(scores, k: int) -> list[int]:
+    """
+    Indices of the k highest scores, best first, via a bounded heap
+    (O(N log k)). Ties keep candidate order.
+    """
+    values = scores.tolist() if isinstance(scores, np.ndarray) else list(scores)
+    return heapq.nlargest(k, range(len(values)), key=values.__getitem__)
@@ -0,0 +1,110 @@
+"""
+Rotating refresh tokens.
+
+Login issues a short-lived access token plus an opaque refresh token;
+POST /auth/refresh swaps a refresh token for a new pair without any
+password hashing. Each refresh token is single use: presenting an already
+rotated token again (a sign it was stolen) revokes its whole family.
+Tokens are random 256-bit strings, so a plain sha256 is enough to store
+them safely and look them up by index.
+
+Rows are deleted as soon as they are no longer needed: a revoked family
+(logout, detected reuse) is deleted outright, and each rotation drops the
+family's expired rows. Rotated rows of a live family stay until they
+expire so reuse can still be detected. `python -m app.refresh_tokens`
+purges every expired row; run it periodically (e.g. nightly) to clear
+families nobody refreshes anymore.
+"""
+import hashlib
+import secrets
+from datetime import datetime, timedelta, timezone
+
+from fastapi import HTTPException
+from sqlalchemy import delete, update
+from sqlalchemy.orm import Session
+
+from . import models
+from .config import settings
+from .db import SessionLocal
+
+
+def _digest(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def issue_refresh_token(db: Session, user_id: int, family_id: str | None = None) -> str:
+    """Add a new refresh token to the session (caller commits) and return it."""
+    token = secrets.token_urlsafe(32)
+    db.add(models.RefreshToken(
+        user_id=user_id,
+        token_hash=_digest(token),
+        family_id=family_id or secrets.token_hex(16),
+        expires_at=datetime.now(timezone.utc) + timedelta(days=settings.REFRESH_TOKEN_DAYS),
+    ))
+    return token
+
+
+def rotate_refresh_token(db: Session, token: str) -> tuple[int, str]:
+    """Consume `token` and return (user_id, new refresh token); 401 if unusable."""
+    now = datetime.now(timezone.utc)
+    RT = models.RefreshToken
+    row = db.query(RT.id, RT.user_id, RT.family_id).filter(RT.token_hash == _digest(token)).first()
+    if row is None:
+        raise HTTPException(401, "Invalid refresh token")
+
+    claimed = db.execute(
+        update(RT)
+        .where(RT.id == row.id, RT.revoked_at.is_(None), RT.expires_at > now)
+        .values(revoked_at=now)
+    ).rowcount
+    if not claimed:
+        # expired, or already rotated: treat reuse as theft and kill the family
+        revoke_family(db, row.family_id)
+        raise HTTPException(401, "Refresh token expired or already used")
+
+    db.execute(delete(RT).where(RT.family_id == row.family_id, RT.expires_at <= now))
+    new_token = issue_refresh_token(db, row.user_id, row.family_id)
+    db.commit()
+    return row.user_id, new_token
+
+
+def revoke_family(db: Session, family_id: str) -> None:
+    # no token of a dead family can be used again, so nothing is worth keeping
+    RT = models.RefreshToken
+    db.execute(delete(RT).where(RT.family_id == family_id))
+    db.commit()
+
+
+def revoke_token(db: Session, token: str) -> None:
+    """Logout: revoke the family the given refresh token belongs to."""
+    RT = models.RefreshToken
+    row = db.query(RT.family_id).filter(RT.token_hash == _digest(token)).first()
+    if row is not None:
+        revoke_family(db, row.family_id)
+
+
+def revoke_user(db: Session, user_id: int) -> None:
+    """Drop every refresh token of the user (caller commits)."""
+    RT = models.RefreshToken
+    db.execute(delete(RT).where(RT.user_id == user_id))
+
+
+def purge_expired(db: Session) -> int:
+    """Delete all expired refresh tokens; returns how many."""
+    RT = models.RefreshToken
+    n = db.execute(delete(RT).where(RT.expires_at <= datetime.now(timezone.utc))).rowcount
+    db.commit()
+    return n
+
+
+def main():
+    db = SessionLocal()
+    try:
+        n = purge_expired(db)
+        print(f"✅ Purged {n} expired refresh tokens")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,14 @@
-from fastapi import APIRouter, Depends, HTTPException, Header
+from fastapi import APIRouter, Depends, Form, HTTPException, Header, Request
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 from ..db import SessionLocal
 from .. import models
-from ..security import hash_password, verify_password, create_access_token, decode_token
+from ..security import create_access_token
+from ..hashing import hash_password_pooled, verify_password_pooled
+from ..principal import Principal, principal_from_header, revoke_tokens, user_state
+from ..refresh_tokens import issue_refresh_token, rotate_refresh_token, revoke_token
+from ..config import settings
+from ..ratelimit import client_ip, login_throttle
 
 
 router = APIRouter()
@@ -14,38 +20,80 @@ def db_dep():
     finally:
         db.close()
 
+def get_principal(authorization: str | None = Header(default=None)) -> Principal:
+    """Caller identity from the token alone; no per-request users query."""
+    return principal_from_header(authorization)
+
 def get_current_user(
-    authorization: str | None = Header(default=None),
+    principal: Principal = Depends(get_principal),
     db: Session = Depends(db_dep),
 ) -> models.User:
-    if not authorization or not authorization.lower().startswith("bearer "):
-        raise HTTPException(401, "Missing token")
+    """Full User row, for handlers that need more than the principal."""
+    return principal.load_user(db)
 
-    token = authorization.split(" ", 1)[1]
-    sub = decode_token(token)
-    if not sub:
-        raise HTTPException(401, "Invalid token")
 
-    user = db.query(models.User).filter_by(id=int(sub)).first()
-    if not user:
-        raise HTTPException(401, "User not found")
+def _token_response(access_token: str, refresh_token: str) -> dict:
+    return {
+        "access_token": access_token,
+        "token_type": "bearer",
+        "expires_in": settings.ACCESS_TOKEN_MINUTES * 60,
+        "refresh_token": refresh_token,
+    }
 
-    return user
+# register/login are async so that waiting on bcrypt only occupies the hash
+# pool's threads; their short database steps still run in the threadpool
 
+def _find_user(db: Session, email: str) -> models.User | None:
+    return db.query(models.User).filter_by(email=email).first()
+
+def _add_user(db: Session, email: str, password_hash: str, full_name: str) -> None:
+    db.add(models.User(email=email, password_hash=password_hash, full_name=full_name))
+    db.commit()
+
+def _finish_login(db: Session, u: models.User, new_hash: str | None) -> str:
+    if new_hash:
+        # bcrypt cost changed since this hash was made: upgrade transparently
+        u.password_hash = new_hash
+    refresh = issue_refresh_token(db, u.id)
+    db.commit()
+    return refresh
 
 @router.post("/register")
-def register(email: str, password: str, full_name: str = "", db: Session = Depends(db_dep)):
-    if db.query(models.User).filter_by(email=email).first():
+async def register(email: str, password: str, full_name: str = "", db: Session = Depends(db_dep)):
+    if await run_in_threadpool(_find_user, db, email):
         raise HTTPException(400, "Email already exists")
-    u = models.User(email=email, password_hash=hash_password(password), full_name=full_name)
-    db.add(u)
-    db.commit()
+    await run_in_threadpool(_add_user, db, email, await hash_password_pooled(password), full_name)
     return {"ok": True}
 
 @router.post("/login")
-def login(email: str, password: str, db: Session = Depends(db_dep)):
-    u = db.query(models.User).filter_by(email=email).first()
-    if not u or not verify_password(password, u.password_hash):
+async def login(email: str, password: str, request: Request, db: Session = Depends(db_dep)):
+    await run_in_threadpool(login_throttle.check, client_ip(request), email)
+    u = await run_in_threadpool(_find_user, db, email)
+    if not u:
         raise HTTPException(401, "Invalid credentials")
-    token = create_access_token(str(u.id))
-    return {"access_token": token, "token_type": "bearer"}
+    ok, new_hash = await verify_password_pooled(password, u.password_hash)
+    if not ok:
+        raise HTTPException(401, "Invalid credentials")
+    token = create_access_token(str(u.id), u.role, u.token_version or 0)
+    refresh = await run_in_threadpool(_finish_login, db, u, new_hash)
+    return _token_response(token, refresh)
+
+@router.post("/refresh")
+def refresh(refresh_token: str = Form(...), db: Session = Depends(db_dep)):
+    # form body, not a query parameter: a 30-day credential must stay out of access logs
+    user_id, new_refresh = rotate_refresh_token(db, refresh_token)
+    state = user_state(user_id)
+    if state is None:
+        raise HTTPException(401, "User not found")
+    token_version, role = state
+    return _token_response(create_access_token(str(user_id), role, token_version), new_refresh)
+
+@router.post("/logout")
+def logout(refresh_token: str = Form(...), db: Session = Depends(db_dep)):
+    revoke_token(db, refresh_token)
+    return {"ok": True}
+
+@router.post("/logout-all")
+def logout_all(principal: Principal = Depends(get_principal), db: Session = Depends(db_dep)):
+    revoke_tokens(db, principal.id)
+    return {"ok": True}
@@ -1,52 +1,42 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
 from sqlalchemy.orm import Session
-from sqlalchemy import asc
-from ..db import SessionLocal
-from .. import models
+from ..db_routing import db_routing
+from ..catalog import get_snapshot, get_snapshot_async
+from ..http_cache import not_modified, with_etag
 
 router = APIRouter()
+async_router = APIRouter()  # used instead of the GET below when DB_ASYNC is on
 
-def db_dep():
-    db = SessionLocal()
+def read_db_dep():
+    db = db_routing.session()
     try:
         yield db
     finally:
         db.close()
 
+async def async_read_db_dep():
+    async with db_routing.async_session() as adb:
+        yield adb
+
 @router.get("/{course_id}")
-def get_course(course_id: int, db: Session = Depends(db_dep)):
-    course = db.query(models.Course).filter_by(id=course_id).first()
+def get_course(course_id: int, request: Request, response: Response, db: Session = Depends(read_db_dep)):
+    return _course_detail(get_snapshot(db), course_id, request, response)
+
+@async_router.get("/{course_id}")
+async def get_course_async(course_id: int, request: Request, response: Response, adb=Depends(async_read_db_dep)):
+    return _course_detail(await get_snapshot_async(adb), course_id, request, response)
+
+def _course_detail(snap, course_id, request, response):
+    key = ("course", course_id)
+    hit = not_modified(request, snap, key)
+    if hit:
+        return hit
+    return with_etag(request, response, snap, key, _course_body(snap.course(course_id)))
+
+def _course_body(course):
     if not course:
         raise HTTPException(404, "Course not found")
 
-    modules = (
-        db.query(models.Module)
-        .filter_by(course_id=course_id)
-        .order_by(asc(models.Module.sort_order))
-        .all()
-    )
-
-    module_ids = [m.id for m in modules]
-    lessons = []
-    if module_ids:
-        lessons = (
-            db.query(models.Lesson)
-            .filter(models.Lesson.module_id.in_(module_ids))
-            .order_by(asc(models.Lesson.module_id), asc(models.Lesson.sort_order))
-            .all()
-        )
-
-    # group lessons by module
-    by_module = {}
-    for L in lessons:
-        by_module.setdefault(L.module_id, []).append({
-            "id": L.id,
-            "title": L.title,
-            "lesson_type": L.lesson_type,
-            "difficulty": L.difficulty,
-            "sort_order": L.sort_order
-        })
-
     return {
         "id": course.id,
         "title": course.title,
@@ -56,8 +46,17 @@ def get_course(course_id: int, db: Session = Depends(db_dep)):
                 "id": m.id,
                 "title": m.title,
                 "sort_order": m.sort_order,
-                "lessons": by_module.get(m.id, [])
+                "lessons": [
+                    {
+                        "id": L.id,
+                        "title": L.title,
+                        "lesson_type": L.lesson_type,
+                        "difficulty": L.difficulty,
+                        "sort_order": L.sort_order
+                    }
+                    for L in m.lessons
+                ]
             }
-            for m in modules
+            for m in course.modules
         ]
     }
@@ -1,19 +1,60 @@
-from fastapi import APIRouter, Depends
+from bisect import bisect_right
+
+from fastapi import APIRouter, Depends, Query, Request, Response
 from sqlalchemy.orm import Session
-from ..db import SessionLocal
-from .. import models
+from ..db_routing import db_routing
+from ..catalog import get_snapshot, get_snapshot_async
+from ..pagination import decode_cursor, parse_fields, set_next_cursor
+from ..http_cache import not_modified, with_etag
 
 router = APIRouter()
+COURSE_FIELDS = ("id", "title", "description")
+async_router = APIRouter()  # used instead of the GET above when DB_ASYNC is on
 
-def db_dep():
-    db = SessionLocal()
+def read_db_dep():
+    db = db_routing.session()
     try:
         yield db
     finally:
         db.close()
 
+async def async_read_db_dep():
+    async with db_routing.async_session() as adb:
+        yield adb
+
 @router.get("")
-def list_courses(db: Session = Depends(db_dep)):
-    rows = db.query(models.Course).all()
-    return [{"id": c.id, "title": c.title, "description": c.description} for c in rows]
+def list_courses(
+    request: Request,
+    response: Response,
+    limit: int = Query(100, ge=1, le=500),
+    cursor: str | None = None,
+    fields: str | None = Query(None, description="comma-separated subset of id,title,description"),
+    db: Session = Depends(read_db_dep),
+):
+    """Courses by id, `limit` per page; the next page's cursor is in X-Next-Cursor."""
+    after, cols = decode_cursor("courses", cursor), parse_fields(fields, COURSE_FIELDS)
+    return _course_list(get_snapshot(db), request, response, limit, after, cols)
+
+@async_router.get("")
+async def list_courses_async(
+    request: Request,
+    response: Response,
+    limit: int = Query(100, ge=1, le=500),
+    cursor: str | None = None,
+    fields: str | None = Query(None, description="comma-separated subset of id,title,description"),
+    adb=Depends(async_read_db_dep),
+):
+    after, cols = decode_cursor("courses", cursor), parse_fields(fields, COURSE_FIELDS)
+    return _course_list(await get_snapshot_async(adb), request, response, limit, after, cols)
+
+def _course_list(snap, request, response, limit, after, cols):
+    key = ("courses", limit, after, cols)
+    hit = not_modified(request, snap, key)
+    if hit:
+        return hit
+    ids = snap.course_ids
+    start = 0 if after is None else bisect_right(ids, after)
+    page = ids[start:start + limit]
+    set_next_cursor(request, response, "courses", page[-1] if start + limit < len(ids) else None)
+    return with_etag(request, response, snap, key, [{f: getattr(snap.courses[cid], f) for f in cols} for cid in page])
 
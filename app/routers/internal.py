@@ -0,0 +1,66 @@
+from fastapi import APIRouter, Depends, HTTPException
+
+from .auth import get_principal
+from ..principal import Principal
+from ..rec_cache import rec_cache
+from ..rec_log import rec_log
+from ..security import token_cache
+from ..hashing import hash_pool
+from ..ratelimit import login_throttle
+from ..db import engine, read_engine
+from ..db_routing import db_routing
+from ..db_async import async_engine, async_read_engine
+from ..pool_metrics import async_pool_metrics, async_read_pool_metrics, pool_metrics, read_pool_metrics
+
+
+def require_admin(principal: Principal = Depends(get_principal)) -> Principal:
+    """Operational stats are for operators only."""
+    if principal.role != "admin":
+        raise HTTPException(403, "Admin only")
+    return principal
+
+
+router = APIRouter(dependencies=[Depends(require_admin)])
+
+
+@router.get("/cache/recommendation")
+def recommendation_cache_stats():
+    return rec_cache.stats()
+
+
+@router.get("/recommendation-log")
+def recommendation_log_stats():
+    return rec_log.stats()
+
+
+@router.get("/cache/tokens")
+def token_cache_stats():
+    return token_cache.stats()
+
+
+@router.get("/hash-pool")
+def hash_pool_stats():
+    return hash_pool.stats()
+
+
+@router.get("/login-throttle")
+def login_throttle_stats():
+    return {"backend": type(login_throttle.backend).__name__, "rejected": login_throttle.rejected}
+
+
+@router.get("/db/pool")
+def db_pool_stats():
+    """The primary's pool, plus the replica's and the async engines' when configured."""
+    out = pool_metrics.snapshot(engine.pool)
+    if read_engine is not engine:
+        out["replica"] = read_pool_metrics.snapshot(read_engine.pool)
+    if async_engine is not None:
+        out["async"] = async_pool_metrics.snapshot(async_engine.sync_engine.pool)
+    if async_read_engine is not async_engine:
+        out["async_replica"] = async_read_pool_metrics.snapshot(async_read_engine.sync_engine.pool)
+    return out
+
+
+@router.get("/db/routing")
+def db_routing_stats():
+    return db_routing.stats()
@@ -1,20 +1,46 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
 from sqlalchemy.orm import Session
-from ..db import SessionLocal
-from .. import models
+from ..db_routing import db_routing
+from ..catalog import get_snapshot, get_snapshot_async, lesson_content_async
+from ..http_cache import not_modified, with_etag
 
 router = APIRouter()
+async_router = APIRouter()  # used instead of the GET below when DB_ASYNC is on
 
-def db_dep():
-    db = SessionLocal()
+def read_db_dep():
+    db = db_routing.session()
     try:
         yield db
     finally:
         db.close()
 
+async def async_read_db_dep():
+    async with db_routing.async_session() as adb:
+        yield adb
+
 @router.get("/{lesson_id}")
-def get_lesson(lesson_id: int, db: Session = Depends(db_dep)):
-    lesson = db.query(models.Lesson).filter_by(id=lesson_id).first()
+def get_lesson(lesson_id: int, request: Request, response: Response, db: Session = Depends(read_db_dep)):
+    snap = get_snapshot(db)
+    key = ("lesson", lesson_id)
+    hit = not_modified(request, snap, key)
+    if hit:
+        return hit  # without fetching the lesson body
+    lesson = snap.lesson(lesson_id)
+    body = _lesson_body(lesson, lesson and snap.lesson_content(db, lesson_id))
+    return with_etag(request, response, snap, key, body)
+
+@async_router.get("/{lesson_id}")
+async def get_lesson_async(lesson_id: int, request: Request, response: Response, adb=Depends(async_read_db_dep)):
+    snap = await get_snapshot_async(adb)
+    key = ("lesson", lesson_id)
+    hit = not_modified(request, snap, key)
+    if hit:
+        return hit
+    lesson = snap.lesson(lesson_id)
+    body = _lesson_body(lesson, lesson and await lesson_content_async(adb, snap, lesson_id))
+    return with_etag(request, response, snap, key, body)
+
+def _lesson_body(lesson, content):
     if not lesson:
         raise HTTPException(404, "Lesson not found")
 
@@ -24,5 +50,5 @@ def get_lesson(lesson_id: int, db: Session = Depends(db_dep)):
         "title": lesson.title,
         "lesson_type": lesson.lesson_type,
         "difficulty": lesson.difficulty,
-        "content": lesson.content or ""
+        "content": content or ""
     }
@@ -2,13 +2,14 @@ from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 
 from ..db import get_db
-from .. import models
+from ..catalog import get_snapshot
 
 router = APIRouter()
 
 @router.get("/{lesson_id}")
 def get_lesson_by_id(lesson_id: int, db: Session = Depends(get_db)):
-    lesson = db.query(models.Lesson).filter(models.Lesson.id == lesson_id).first()
+    snap = get_snapshot(db)
+    lesson = snap.lesson(lesson_id)
     if not lesson:
         raise HTTPException(status_code=404, detail="Lesson not found")
 
@@ -18,6 +19,6 @@ def get_lesson_by_id(lesson_id: int, db: Session = Depends(get_db)):
         "title": lesson.title,
         "lesson_type": lesson.lesson_type,
         "difficulty": lesson.difficulty,
-        "content": lesson.content or "",
+        "content": snap.lesson_content(db, lesson_id) or "",
         "sort_order": lesson.sort_order,
     }
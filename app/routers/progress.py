@@ -1,13 +1,23 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Header, Query, Request, Response
+from sqlalchemy import select
 from sqlalchemy.orm import Session
-from sqlalchemy.exc import IntegrityError
 import json
 
 from ..db import SessionLocal
 from .. import models
-from .auth import get_current_user
+from .auth import get_principal
+from ..principal import Principal, principal_from_header_async, user_id_from_header
+from ..rec_cache import rec_cache
+from ..catalog import get_snapshot
+from ..progress_store import record_attempt
+from ..pagination import decode_cursor, parse_fields, set_next_cursor
+from ..db_routing import db_routing
+from ..pref_learning import record_outcome
+from ..prereq import frontiers
 
 router = APIRouter()
+PROGRESS_FIELDS = ("lesson_id", "status", "score", "attempts", "mastery", "updated_at")
+async_router = APIRouter()  # used instead of GET /me when DB_ASYNC is on
 
 def db_dep():
     db = SessionLocal()
@@ -16,69 +26,83 @@ def db_dep():
     finally:
         db.close()
 
-def _get_or_create_progress(db: Session, user_id: int, lesson_id: int):
-    p = db.query(models.Progress).filter_by(user_id=user_id, lesson_id=lesson_id).first()
-    if p:
-        return p
-    p = models.Progress(user_id=user_id, lesson_id=lesson_id, status="in_progress")
-    db.add(p)
-    db.commit()
-    db.refresh(p)
-    return p
+def read_db_dep(user: Principal = Depends(get_principal)):
+    db = db_routing.session(user.id)
+    try:
+        yield db
+    finally:
+        db.close()
+
+async def async_read_db_dep(authorization: str | None = Header(default=None)):
+    async with db_routing.async_session(user_id_from_header(authorization)) as adb:
+        yield adb
 
 @router.post("/complete")
 def mark_completed(
     lesson_id: int,
     score: float | None = None,
     db: Session = Depends(db_dep),
-    user: models.User = Depends(get_current_user),
+    user: Principal = Depends(get_principal),
 ):
-    lesson = db.query(models.Lesson).filter_by(id=lesson_id).first()
+    snap = get_snapshot(db)
+    lesson = snap.lesson(lesson_id)
     if not lesson:
         raise HTTPException(404, "Lesson not found")
 
-    p = db.query(models.Progress).filter_by(user_id=user.id, lesson_id=lesson_id).first()
-    if p:
-        p.status = "completed"
-        if score is not None:
-            p.score = score        # ✅ save score on update
-        db.commit()
-        return {"ok": True, "status": p.status, "score": p.score}
-
-    p = models.Progress(user_id=user.id, lesson_id=lesson_id, status="completed", score=score)  # ✅ save score on insert
-    db.add(p)
-    try:
-        db.commit()
-    except IntegrityError:
-        db.rollback()
-        p = db.query(models.Progress).filter_by(user_id=user.id, lesson_id=lesson_id).first()
-        if p:
-            p.status = "completed"
-            if score is not None:
-                p.score = score
-            db.commit()
-            return {"ok": True, "status": p.status, "score": p.score}
-        raise
-
+    # the attempt and the preference update it drives commit together
+    outcome = 1.0 if score is None else score
+    p = record_attempt(db, user.id, lesson_id, "completed", outcome, score, commit=False)
+    record_outcome(db, user.id, lesson.lesson_type, outcome, commit=False)
+    db.commit()
+    rec_cache.invalidate_user(user.id)
+    db_routing.wrote(user.id)
+    frontiers.complete(user.id, lesson_id)
     return {"ok": True, "status": p.status, "score": p.score}
 
 
 @router.get("/me")
 def my_progress(
-    db: Session = Depends(db_dep),
-    user: models.User = Depends(get_current_user),
+    request: Request,
+    response: Response,
+    limit: int = Query(500, ge=1, le=1000),
+    cursor: str | None = None,
+    fields: str | None = Query(None, description="comma-separated subset of " + ",".join(PROGRESS_FIELDS)),
+    db: Session = Depends(read_db_dep),
+    user: Principal = Depends(get_principal),
 ):
-    rows = db.query(models.Progress).filter_by(user_id=user.id).all()
+    """The user's progress rows in write order, `limit` per page; the next page's cursor is in X-Next-Cursor."""
+    after, cols = decode_cursor("progress", cursor), parse_fields(fields, PROGRESS_FIELDS)
+    rows = db.execute(_progress_query(user.id, after, limit, cols)).all()
+    return _progress_body(rows, cols, limit, request, response)
+
+@async_router.get("/me")
+async def my_progress_async(
+    request: Request,
+    response: Response,
+    limit: int = Query(500, ge=1, le=1000),
+    cursor: str | None = None,
+    fields: str | None = Query(None, description="comma-separated subset of " + ",".join(PROGRESS_FIELDS)),
+    authorization: str | None = Header(default=None),
+    adb=Depends(async_read_db_dep),
+):
+    after, cols = decode_cursor("progress", cursor), parse_fields(fields, PROGRESS_FIELDS)
+    user = await principal_from_header_async(authorization, adb)
+    rows = (await adb.execute(_progress_query(user.id, after, limit, cols))).all()
+    return _progress_body(rows, cols, limit, request, response)
+
+def _progress_query(user_id: int, after: int | None, limit: int, cols):
+    # only the requested columns, plus id for the cursor; one extra row tells whether a next page exists
+    P = models.Progress
+    stmt = select(P.id, *(getattr(P, f) for f in cols)).where(P.user_id == user_id)
+    if after is not None:
+        stmt = stmt.where(P.id > after)
+    return stmt.order_by(P.id).limit(limit + 1)
+
+def _progress_body(rows, cols, limit, request, response):
+    set_next_cursor(request, response, "progress", rows[limit - 1].id if len(rows) > limit else None)
     return [
-        {
-            "lesson_id": r.lesson_id,
-            "status": getattr(r, "status", None),
-            "score": getattr(r, "score", None),
-            "attempts": getattr(r, "attempts", None),
-            "mastery": getattr(r, "mastery", None),
-            "updated_at": str(getattr(r, "updated_at", "")),
-        }
-        for r in rows
+        {f: str(r.updated_at or "") if f == "updated_at" else getattr(r, f) for f in cols}
+        for r in rows[:limit]
     ]
 
 @router.post("/quiz/submit")
@@ -86,9 +110,10 @@ def submit_quiz(
     lesson_id: int,
     answers: dict,  # {"q1": 1, "q2": 0, ...} (choice index per question)
     db: Session = Depends(db_dep),
-    user: models.User = Depends(get_current_user),
+    user: Principal = Depends(get_principal),
 ):
-    lesson = db.query(models.Lesson).filter_by(id=lesson_id).first()
+    snap = get_snapshot(db)
+    lesson = snap.lesson(lesson_id)
     if not lesson:
         raise HTTPException(404, "Lesson not found")
 
@@ -97,7 +122,7 @@ def submit_quiz(
 
     # content must be JSON with "questions"
     try:
-        payload = json.loads(lesson.content or "{}")
+        payload = json.loads(snap.lesson_content(db, lesson_id) or "{}")
         questions = payload.get("questions", [])
         passing = float(payload.get("passingScore", 0.7))
     except Exception:
@@ -120,27 +145,17 @@ def submit_quiz(
 
     score = (correct / total) if total else 0.0
 
-    p = _get_or_create_progress(db, user.id, lesson_id)
-
-    # increment attempts if field exists
-    if hasattr(p, "attempts"):
-        p.attempts = int(getattr(p, "attempts") or 0) + 1
-
-    # store score if field exists
-    if hasattr(p, "score"):
-        p.score = float(score)
-
-    # update mastery if field exists
-    # simple: mastery nudges toward score, capped 0..1
-    if hasattr(p, "mastery"):
-        old = float(getattr(p, "mastery") or 0.0)
-        new = max(0.0, min(1.0, (old * 0.6) + (score * 0.4)))
-        p.mastery = new
-
     # pass/fail -> status
-    p.status = "completed" if score >= passing else "in_progress"
-
+    status = "completed" if score >= passing else "in_progress"
+    p = record_attempt(db, user.id, lesson_id, status, score, float(score), commit=False)
+    record_outcome(db, user.id, lesson.lesson_type, score, commit=False)
     db.commit()
+    rec_cache.invalidate_user(user.id)
+    db_routing.wrote(user.id)
+    if p.status == "completed":
+        frontiers.complete(user.id, lesson_id)
+    else:
+        frontiers.uncomplete(user.id, lesson_id)
 
     return {
         "ok": True,
@@ -149,7 +164,7 @@ def submit_quiz(
         "total": total,
         "score": score,
         "status": p.status,
-        "mastery": float(getattr(p, "mastery", 0.0) or 0.0),
-        "attempts": int(getattr(p, "attempts", 0) or 0),
+        "mastery": float(p.mastery),
+        "attempts": p.attempts,
         "passingScore": passing,
     }
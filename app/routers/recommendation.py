@@ -1,13 +1,21 @@
+from itertools import islice
+
 from fastapi import APIRouter, Depends, HTTPException, Query, Header
 from sqlalchemy.orm import Session
-from sqlalchemy import asc
 
 from ..db import SessionLocal
-from .. import models
-from ..security import decode_token
-from ..recommender import score_candidate
+from ..principal import principal_from_header, principal_from_header_async, user_id_from_header
+from ..recommender import score_batch, format_reason, top_k
+from ..catalog import get_snapshot, get_snapshot_async, current_version
+from ..rec_cache import rec_cache
+from ..db_routing import db_routing
+from ..rec_log import rec_log
+from ..prereq import frontiers
+from ..progress_store import get_progress, get_progress_async
+from ..preferences import PREF_FIELDS, get_preferences, get_preferences_async, save_preferences
 
 router = APIRouter()
+async_router = APIRouter()  # used instead of GET /next when DB_ASYNC is on
 
 def db_dep():
     db = SessionLocal()
@@ -16,56 +24,50 @@ def db_dep():
     finally:
         db.close()
 
+def read_db_dep(authorization: str | None = Header(default=None)):
+    db = db_routing.session(get_user_id_from_auth(authorization))
+    try:
+        yield db
+    finally:
+        db.close()
+
+async def async_read_db_dep(authorization: str | None = Header(default=None)):
+    async with db_routing.async_session(user_id_from_header(authorization)) as adb:
+        yield adb
+
 def get_user_id_from_auth(auth: str | None) -> int:
-    if not auth or not auth.lower().startswith("bearer "):
-        raise HTTPException(401, "Missing token")
-    token = auth.split(" ", 1)[1]
-    sub = decode_token(token)
-    if not sub:
-        raise HTTPException(401, "Invalid token")
-    return int(sub)
+    return principal_from_header(auth).id
+
+def _unlocked(snap, user_id: int, course_id: int, prog: dict, mode: str):
+    # baseline is the fixed-order control group and ignores prerequisites
+    return frontiers.unlocked(snap, user_id, course_id, prog) if mode == "adaptive" else None
 
-@router.get("/next")
-def next_lesson(
-    course_id: int,
-    mode: str = Query("adaptive", pattern="^(adaptive|baseline)$"),
-    authorization: str | None = Header(default=None),
-    db: Session = Depends(db_dep),
-):
-    user_id = get_user_id_from_auth(authorization)
 
-    prefs = db.query(models.UserPreferences).filter_by(user_id=user_id).first()
-    if not prefs:
-        prefs = models.UserPreferences(user_id=user_id)
-        db.add(prefs)
-        db.commit()
-        db.refresh(prefs)
-
-    lessons = (
-        db.query(models.Lesson)
-        .join(models.Module, models.Module.id == models.Lesson.module_id)
-        .filter(models.Module.course_id == course_id)
-        .order_by(asc(models.Module.sort_order), asc(models.Lesson.sort_order))
-        .all()
-    )
+def _rank(lessons, prog: dict, prefs, mode: str, k: int = 1, unlocked=None) -> list[dict]:
+    """
+    Best `k` next lessons out of `lessons` (course order); raises 404 when
+    none is left. Adaptive mode only scores the open `unlocked` lessons when
+    given, falling back to the whole course if the prerequisite graph leaves none.
+    """
     if not lessons:
         raise HTTPException(404, "No lessons found")
 
-    prog_rows = db.query(models.Progress).filter_by(user_id=user_id).all()
-    prog = {p.lesson_id: p for p in prog_rows}
-
     if mode == "baseline":
-        for L in lessons:
-            p = prog.get(L.id)
-            if not p or getattr(p, "status", None) != "completed":
-                return {
-                    "lesson_id": L.id,
-                    "title": L.title,
-                    "lesson_type": L.lesson_type,
-                    "difficulty": L.difficulty,
-                    "reason": "Baseline: fixed order.",
-                }
-        raise HTTPException(404, "All lessons completed")
+        # fixed order: the first k open lessons already are the top k
+        todo = (L for L in lessons if getattr(prog.get(L.id), "status", None) != "completed")
+        out = [
+            {
+                "lesson_id": L.id,
+                "title": L.title,
+                "lesson_type": L.lesson_type,
+                "difficulty": L.difficulty,
+                "reason": "Baseline: fixed order.",
+            }
+            for L in islice(todo, k)
+        ]
+        if not out:
+            raise HTTPException(404, "All lessons completed")
+        return out
 
     def pref_weight(lesson_type: str) -> float:
         lt = (lesson_type or "").lower()
@@ -76,28 +78,233 @@ def next_lesson(
             "quiz": getattr(prefs, "prefer_quiz", 0.25),
         }.get(lt, 0.25))
 
-    best = None
-    for L in lessons:
-        p = prog.get(L.id)
-        if p and getattr(p, "status", None) == "completed":
-            continue
+    candidates = []
+    mastery, attempts, weights, difficulty = [], [], [], []
+    def is_open(L) -> bool:
+        return getattr(prog.get(L.id), "status", None) != "completed"
 
-        mastery = float(getattr(p, "mastery", 0.0) or 0.0) if p else 0.0
-        attempts = int(getattr(p, "attempts", 0) or 0) if p else 0
+    for L in [L for L in unlocked or () if is_open(L)] or lessons:
+        if not is_open(L):
+            continue
 
-        s, r = score_candidate(mastery, attempts, pref_weight(L.lesson_type), L.difficulty)
-        if best is None or s > best[0]:
-            best = (s, r, L)
+        p = prog.get(L.id)
+        candidates.append(L)
+        mastery.append(float(p.mastery) if p else 0.0)
+        attempts.append(p.attempts if p else 0)
+        weights.append(pref_weight(L.lesson_type))
+        difficulty.append(L.difficulty)
 
-    if not best:
+    if not candidates:
         raise HTTPException(404, "No candidate lesson")
 
-    s, r, L = best
-    return {
-        "lesson_id": L.id,
-        "title": L.title,
-        "lesson_type": L.lesson_type,
-        "difficulty": L.difficulty,
-        "reason": f"Adaptive: {r}",
-        "score": s,
-    }
+    scores, best = score_batch(mastery, attempts, weights, difficulty)
+    picks = [best] if k == 1 else top_k(scores, k)
+    out = []
+    for i in picks:
+        L = candidates[i]
+        r = format_reason(mastery[i], attempts[i], weights[i], difficulty[i])
+        out.append({
+            "lesson_id": L.id,
+            "title": L.title,
+            "lesson_type": L.lesson_type,
+            "difficulty": L.difficulty,
+            "reason": f"Adaptive: {r}",
+            "score": float(scores[i]),
+        })
+    return out
+
+
+def _log_served(user_id: int, mode: str, items: list[dict]) -> None:
+    for item in items:
+        rec_log.record(user_id, item["lesson_id"], mode, item.get("score"), item.get("reason"))
+
+
+def _cache_key(user_id: int, course_id: int, mode: str, k: int) -> tuple:
+    return (user_id, course_id, mode, k, current_version())
+
+
+@router.get("/next")
+def next_lesson(
+    course_id: int,
+    mode: str = Query("adaptive", pattern="^(adaptive|baseline)$"),
+    authorization: str | None = Header(default=None),
+    db: Session = Depends(read_db_dep),
+):
+    user_id = get_user_id_from_auth(authorization)
+    key = _cache_key(user_id, course_id, mode, 1)
+    cached = rec_cache.get(key)
+    if cached is not None:
+        _log_served(user_id, mode, cached[:1])
+        return cached[0]
+
+    gen = rec_cache.generation(user_id)
+    prefs = get_preferences(db, user_id)
+
+    snap = get_snapshot(db)
+    course = snap.course(course_id)
+    lessons = course.lessons if course else ()
+    if not lessons:
+        raise HTTPException(404, "No lessons found")
+
+    prog = get_progress(db, user_id)
+    ranked = _rank(lessons, prog, prefs, mode, 1, _unlocked(snap, user_id, course_id, prog, mode))
+    rec_cache.put(key, ranked, gen)
+    _log_served(user_id, mode, ranked)
+    return ranked[0]
+
+
+@async_router.get("/next")
+async def next_lesson_async(
+    course_id: int,
+    mode: str = Query("adaptive", pattern="^(adaptive|baseline)$"),
+    authorization: str | None = Header(default=None),
+    adb=Depends(async_read_db_dep),
+):
+    user_id = (await principal_from_header_async(authorization, adb)).id
+    key = _cache_key(user_id, course_id, mode, 1)
+    cached = rec_cache.get(key)
+    if cached is not None:
+        _log_served(user_id, mode, cached[:1])
+        return cached[0]
+
+    gen = rec_cache.generation(user_id)
+    prefs = await get_preferences_async(adb, user_id)
+
+    snap = await get_snapshot_async(adb)
+    course = snap.course(course_id)
+    lessons = course.lessons if course else ()
+    if not lessons:
+        raise HTTPException(404, "No lessons found")
+
+    prog = await get_progress_async(adb, user_id)
+    ranked = _rank(lessons, prog, prefs, mode, 1, _unlocked(snap, user_id, course_id, prog, mode))
+    rec_cache.put(key, ranked, gen)
+    _log_served(user_id, mode, ranked)
+    return ranked[0]
+
+
+@router.get("/top")
+def top_lessons(
+    course_id: int,
+    k: int = Query(5, ge=1, le=50),
+    mode: str = Query("adaptive", pattern="^(adaptive|baseline)$"),
+    authorization: str | None = Header(default=None),
+    db: Session = Depends(read_db_dep),
+):
+    """The `k` best next lessons, best first, so clients can offer alternatives."""
+    user_id = get_user_id_from_auth(authorization)
+    key = _cache_key(user_id, course_id, mode, k)
+    cached = rec_cache.get(key)
+    if cached is not None:
+        _log_served(user_id, mode, cached)
+        return cached
+
+    gen = rec_cache.generation(user_id)
+    prefs = get_preferences(db, user_id)
+
+    snap = get_snapshot(db)
+    course = snap.course(course_id)
+    lessons = course.lessons if course else ()
+    if not lessons:
+        raise HTTPException(404, "No lessons found")
+
+    prog = get_progress(db, user_id)
+    ranked = _rank(lessons, prog, prefs, mode, k, _unlocked(snap, user_id, course_id, prog, mode))
+    rec_cache.put(key, ranked, gen)
+    _log_served(user_id, mode, ranked)
+    return ranked
+
+
+@router.get("/next/batch")
+def next_lessons(
+    course_ids: list[int] | None = Query(None),
+    mode: str = Query("adaptive", pattern="^(adaptive|baseline)$"),
+    authorization: str | None = Header(default=None),
+    db: Session = Depends(read_db_dep),
+):
+    """
+    Next lesson for several courses in one call. Without `course_ids` it
+    covers every course the user is enrolled in (has progress in).
+    Preferences and progress are loaded at most once, and only if some
+    course misses the cache; per-course failures are reported inline
+    instead of failing the whole batch.
+    """
+    user_id = get_user_id_from_auth(authorization)
+    gen = rec_cache.generation(user_id)
+    snap = get_snapshot(db)
+    prefs = prog = None
+
+    if course_ids is None:
+        prog = get_progress(db, user_id)
+        enrolled = {snap.lessons[lid].course_id for lid in prog if lid in snap.lessons}
+        course_ids = [cid for cid in snap.course_ids if cid in enrolled]
+
+    results = []
+    for cid in dict.fromkeys(course_ids):
+        key = _cache_key(user_id, cid, mode, 1)
+        ranked = rec_cache.get(key)
+        if ranked is None:
+            if prefs is None:
+                prefs = get_preferences(db, user_id)
+            if prog is None:
+                prog = get_progress(db, user_id)
+            course = snap.course(cid)
+            try:
+                ranked = _rank(
+                    course.lessons if course else (), prog, prefs, mode, 1,
+                    _unlocked(snap, user_id, cid, prog, mode),
+                )
+            except HTTPException as e:
+                results.append({"course_id": cid, "error": e.detail})
+                continue
+            rec_cache.put(key, ranked, gen)
+        _log_served(user_id, mode, ranked[:1])
+        results.append({"course_id": cid, **ranked[0]})
+    return results
+
+
+@router.post("/accept")
+def accept_recommendation(
+    lesson_id: int,
+    authorization: str | None = Header(default=None),
+):
+    """
+    Called when the student opens a suggested lesson: marks the latest
+    unanswered recommendation of that lesson to this user as accepted.
+    If that row is still queued, the log writer marks it once inserted.
+    """
+    user_id = get_user_id_from_auth(authorization)
+    if not rec_log.accept(user_id, lesson_id):
+        raise HTTPException(404, "No pending recommendation for this lesson")
+    return {"ok": True, "lesson_id": lesson_id, "accepted": True}
+
+
+@router.get("/preferences")
+def my_preferences(
+    authorization: str | None = Header(default=None),
+    db: Session = Depends(read_db_dep),
+):
+    user_id = get_user_id_from_auth(authorization)
+    prefs = get_preferences(db, user_id)
+    return {f: float(getattr(prefs, f)) for f in PREF_FIELDS}
+
+
+@router.put("/preferences")
+def update_preferences(
+    prefer_text: float | None = Query(None, ge=0, le=1),
+    prefer_video: float | None = Query(None, ge=0, le=1),
+    prefer_interactive: float | None = Query(None, ge=0, le=1),
+    prefer_quiz: float | None = Query(None, ge=0, le=1),
+    authorization: str | None = Header(default=None),
+    db: Session = Depends(db_dep),
+):
+    user_id = get_user_id_from_auth(authorization)
+    current = get_preferences(db, user_id)
+    changed = save_preferences(db, user_id, {
+        "prefer_text": prefer_text,
+        "prefer_video": prefer_video,
+        "prefer_interactive": prefer_interactive,
+        "prefer_quiz": prefer_quiz,
+    }, current)
+    prefs = get_preferences(db, user_id) if changed else current
+    return {"changed": changed, **{f: float(getattr(prefs, f)) for f in PREF_FIELDS}}
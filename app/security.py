@@ -1,9 +1,21 @@
+import hashlib
+import heapq
+import threading
+import time
+from collections import OrderedDict
 from datetime import datetime, timedelta, timezone
 from jose import jwt, JWTError
 from passlib.context import CryptContext
 from .config import settings
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# min/max pinned to the target cost so hashes made at any other cost report needs_update
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=settings.BCRYPT_ROUNDS,
+    bcrypt__min_rounds=settings.BCRYPT_ROUNDS,
+    bcrypt__max_rounds=settings.BCRYPT_ROUNDS,
+)
 
 
 def hash_password(pw: str) -> str:
@@ -14,15 +26,92 @@ def verify_password(pw: str, hashed: str) -> bool:
     return pwd_context.verify(pw, hashed)
 
 
-def create_access_token(sub: str) -> str:
+def verify_and_update(pw: str, hashed: str) -> tuple[bool, str | None]:
+    """Like verify_password, plus a fresh hash when `hashed` uses outdated settings."""
+    return pwd_context.verify_and_update(pw, hashed)
+
+
+def create_access_token(sub: str, role: str = "student", token_version: int = 0) -> str:
     exp = datetime.now(timezone.utc) + timedelta(minutes=settings.ACCESS_TOKEN_MINUTES)
-    payload = {"sub": sub, "exp": exp}
+    payload = {"sub": sub, "exp": exp, "role": role, "tv": token_version}
     return jwt.encode(payload, settings.JWT_SECRET, algorithm=settings.JWT_ALG)
 
 
-def decode_token(token: str) -> str | None:
+class TokenCache:
+    """
+    Bounded cache of verified tokens: sha256(token) -> (claims, exp).
+    Entries leave at their `exp` (expiry heap) or by LRU when full, so a
+    cached token is never accepted past its expiry. Invalid tokens are
+    not cached.
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._data: OrderedDict[bytes, tuple[dict, float]] = OrderedDict()
+        self._expiry: list[tuple[float, bytes]] = []
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: bytes) -> dict | None:
+        now = time.time()
+        with self._lock:
+            self._purge(now)
+            item = self._data.get(key)
+            if item is None or item[1] <= now:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return item[0]
+
+    def put(self, key: bytes, claims: dict, exp: float) -> None:
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._data[key] = (claims, exp)
+            self._data.move_to_end(key)
+            heapq.heappush(self._expiry, (exp, key))
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+            if len(self._expiry) > 2 * self.max_entries:
+                # drop heap entries for keys already evicted by LRU
+                self._expiry = [(e, k) for e, k in self._expiry if k in self._data]
+                heapq.heapify(self._expiry)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"entries": len(self._data), "hits": self.hits, "misses": self.misses}
+
+    def _purge(self, now: float) -> None:
+        while self._expiry and self._expiry[0][0] <= now:
+            exp, key = heapq.heappop(self._expiry)
+            item = self._data.get(key)
+            if item is not None and item[1] == exp:
+                del self._data[key]
+
+
+token_cache = TokenCache(settings.TOKEN_CACHE_MAX_ENTRIES)
+
+
+def decode_claims(token: str) -> dict | None:
+    """Verified claims of an access token (cached until exp), or None if invalid."""
+    key = hashlib.sha256(token.encode()).digest()
+    claims = token_cache.get(key)
+    if claims is not None:
+        return claims
     try:
         payload = jwt.decode(token, settings.JWT_SECRET, algorithms=[settings.JWT_ALG])
-        return payload.get("sub")
     except JWTError:
         return None
+    if payload.get("sub") is None:
+        return None
+    claims = {"sub": payload["sub"], "role": payload.get("role"), "tv": int(payload.get("tv", 0))}
+    if payload.get("exp") is not None:
+        token_cache.put(key, claims, float(payload["exp"]))
+    return claims
+
+
+def decode_token(token: str) -> str | None:
+    claims = decode_claims(token)
+    return claims["sub"] if claims else None
@@ -2,6 +2,7 @@ import json
 from sqlalchemy import select
 from .db import SessionLocal, Base, engine
 from . import models
+from .catalog import bump_version
 
 
 def md(*lines: str) -> str:
@@ -1373,6 +1374,7 @@ def run_seed(db):
         delete_course_by_title(db, course["title"])
         seed_course(db, course)
 
+    bump_version()
     print(f"Seeded {len(COURSES)} premium courses ✅")
 
 
@@ -1383,6 +1385,7 @@ def run():
         for course in COURSES:
             delete_course_by_title(db, course["title"])
             seed_course(db, course)
+        bump_version()
         print(f"Seeded {len(COURSES)} premium courses ✅")
     finally:
         db.close()
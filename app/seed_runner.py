@@ -1,8 +1,9 @@
-from app.db import Base, engine, SessionLocal
+from app.db import SessionLocal
+from app.migrations import migrate
 from app.seed import run_seed
 
 def main():
-    Base.metadata.create_all(bind=engine)
+    migrate()
     db = SessionLocal()
     try:
         run_seed(db)
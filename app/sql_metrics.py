@@ -0,0 +1,128 @@
+"""
+Per-request SQL instrumentation. Engine-level cursor events (every engine,
+including the replica and the async engine's sync core) add each
+statement's count and time to the current request's RequestStats, which
+SqlMetricsMiddleware reports in a Server-Timing header and in one JSON log
+line per request on the "app.requests" logger.
+
+With SQL_N_PLUS_ONE_THRESHOLD > 0 the middleware also warns about
+statements that ran that many times in one request: the same SQL text
+repeated with different parameters is usually a per-row lazy load or a
+query in a loop.
+"""
+import json
+import logging
+import time
+from collections import Counter
+from contextvars import ContextVar
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from .config import settings
+
+log = logging.getLogger("app.requests")
+
+
+class RequestStats:
+    __slots__ = ("queries", "db_ms", "statements")
+
+    def __init__(self, track_statements: bool):
+        self.queries = 0
+        self.db_ms = 0.0
+        self.statements: Counter[str] | None = Counter() if track_statements else None
+
+    def repeated(self, threshold: int) -> list[tuple[str, int]]:
+        if not self.statements or threshold <= 0:
+            return []
+        return [(sql, n) for sql, n in self.statements.most_common() if n >= threshold]
+
+
+_current: ContextVar[RequestStats | None] = ContextVar("sql_request_stats", default=None)
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before(conn, cursor, statement, parameters, context, executemany):
+    if _current.get() is not None:
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "handle_error")
+def _on_error(context):
+    # a failed statement never reaches after_cursor_execute; drop its start time
+    starts = context.connection.info.get("query_start") if context.connection is not None else None
+    if starts:
+        starts.pop()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after(conn, cursor, statement, parameters, context, executemany):
+    stats = _current.get()
+    if stats is None or not conn.info.get("query_start"):
+        return
+    stats.db_ms += (time.perf_counter() - conn.info["query_start"].pop()) * 1e3
+    stats.queries += 1
+    if stats.statements is not None:
+        stats.statements[statement] += 1
+
+
+def configure_request_log(level: str) -> None:
+    """
+    Give "app.requests" its own level and stderr handler: under uvicorn's
+    default logging config nothing else would enable INFO for it.
+    """
+    if not level:
+        return
+    log.setLevel(level.upper())
+    if not log.handlers:
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        log.addHandler(handler)
+    log.propagate = False
+
+
+class SqlMetricsMiddleware:
+    """ASGI middleware: collects RequestStats per HTTP request and reports them."""
+
+    def __init__(self, app):
+        self.app = app
+        self.threshold = settings.SQL_N_PLUS_ONE_THRESHOLD
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        stats = RequestStats(self.threshold > 0)
+        token = _current.set(stats)
+        t0 = time.perf_counter()
+        status = 500
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                total = (time.perf_counter() - t0) * 1e3
+                timing = f'db;dur={stats.db_ms:.1f};desc="{stats.queries} queries", total;dur={total:.1f}'
+                message["headers"] = [*message.get("headers", ()), (b"server-timing", timing.encode())]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current.reset(token)
+            self._report(scope, status, stats, (time.perf_counter() - t0) * 1e3)
+
+    def _report(self, scope, status: int, stats: RequestStats, total_ms: float) -> None:
+        repeated = stats.repeated(self.threshold)
+        for sql, n in repeated:
+            log.warning("possible N+1: %s %s ran %dx: %s", scope["method"], scope["path"], n, " ".join(sql.split())[:300])
+        if log.isEnabledFor(logging.INFO):
+            log.info(json.dumps({
+                "method": scope["method"],
+                "path": scope["path"],
+                "status": status,
+                "duration_ms": round(total_ms, 2),
+                "db_queries": stats.queries,
+                "db_ms": round(stats.db_ms, 2),
+                **({"n_plus_one": [{"sql": sql[:300], "count": n} for sql, n in repeated]} if repeated else {}),
+            }))
@@ -0,0 +1,38 @@
+"""
+Shared setup for the benchmarks that run the app against a throwaway database.
+
+Settings are read when `app` is first imported, so call `use_database()`
+before importing anything from it, then `build_schema()` once the app is
+importable:
+
+    from ._setup import build_schema, use_database
+    use_database(prefix="my-bench-")
+    from app import models  # noqa: E402
+"""
+import os
+import tempfile
+
+from sqlalchemy import BigInteger
+from sqlalchemy.ext.compiler import compiles
+
+
+@compiles(BigInteger, "sqlite")
+def _sqlite_bigint(type_, compiler, **kw):
+    # SQLite only autoincrements INTEGER PRIMARY KEY columns
+    return "INTEGER"
+
+
+def use_database(url: str | None = None, prefix: str = "bench-") -> str:
+    """Point the app at `url` (default: a fresh SQLite file in a temp dir) and return it."""
+    if url is None:
+        url = f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix=prefix), 'bench.db')}"
+    os.environ["DATABASE_URL"] = url
+    os.environ.setdefault("JWT_SECRET", "bench-secret")
+    return url
+
+
+def build_schema() -> None:
+    """Bring the database to the current schema the way a deploy does."""
+    from app.migrations import migrate
+
+    migrate()
@@ -0,0 +1,159 @@
+"""
+Concurrent throughput of the hot read endpoints, sync handlers vs DB_ASYNC.
+
+Seeds a local SQLite database, then for each mode starts a uvicorn server
+on it and drives /courses, /courses/{id}, /lessons/{id},
+/recommendation/next and /progress/me with `--concurrency` concurrent
+clients for `--duration` seconds. The recommendation cache is disabled in
+the servers so every /recommendation/next goes to the database.
+
+    python -m benchmarks.bench_async --concurrency 64 --duration 10
+
+Needs httpx (client side) and aiosqlite (async mode); point --database-url
+at a Postgres database to compare with asyncpg instead. The load generator
+shares the machine with the server, so run it where there are spare cores.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import time
+
+from ._setup import build_schema, use_database
+
+ap = argparse.ArgumentParser()
+ap.add_argument("--users", type=int, default=100)
+ap.add_argument("--concurrency", type=int, default=64)
+ap.add_argument("--duration", type=float, default=10.0)
+ap.add_argument("--port", type=int, default=8765)
+ap.add_argument("--database-url", default=None, help="default: fresh SQLite file")
+ap.add_argument("--out", default=None, help="optional JSON results file")
+args = ap.parse_args()
+
+args.database_url = use_database(args.database_url, prefix="async-bench-")
+
+import httpx  # noqa: E402
+
+from app import models  # noqa: E402
+from app.db import SessionLocal  # noqa: E402
+from app.security import create_access_token  # noqa: E402
+from app.seed import run_seed  # noqa: E402
+
+
+def build_dataset(rnd: random.Random):
+    build_schema()
+    db = SessionLocal()
+    try:
+        if db.query(models.Course).count() == 0:
+            run_seed(db)
+        first = (db.query(models.User.id).order_by(models.User.id.desc()).first() or (0,))[0] + 1
+        uids = list(range(first, first + args.users))
+        db.execute(models.User.__table__.insert(), [
+            {"id": uid, "email": f"bench{uid}@bench.local", "password_hash": "x", "role": "student"}
+            for uid in uids
+        ])
+        lesson_ids = [lid for (lid,) in db.query(models.Lesson.id).all()]
+        course_ids = [cid for (cid,) in db.query(models.Course.id).all()]
+        db.execute(models.Progress.__table__.insert(), [
+            {"user_id": uid, "lesson_id": lid, "status": "completed", "score": round(rnd.random(), 2)}
+            for uid in uids
+            for lid in rnd.sample(lesson_ids, len(lesson_ids) // 3)
+        ])
+        db.commit()
+        return uids, course_ids, lesson_ids
+    finally:
+        db.close()
+
+
+def start_server(db_async: bool) -> subprocess.Popen:
+    env = dict(os.environ, DB_ASYNC=str(db_async).lower(), REC_CACHE_MAX_ENTRIES="0")
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(args.port), "--log-level", "warning"],
+        env=env,
+    )
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            if httpx.get(f"http://127.0.0.1:{args.port}/courses", timeout=1).status_code == 200:
+                return proc
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    proc.kill()
+    raise RuntimeError("server did not start")
+
+
+async def drive(uids, course_ids, lesson_ids) -> dict:
+    tokens = {uid: create_access_token(str(uid)) for uid in uids}
+    latencies: list[float] = []
+    errors = 0
+    stop_at = time.perf_counter() + args.duration
+
+    def pick(rnd: random.Random):
+        uid = rnd.choice(uids)
+        auth = {"Authorization": f"Bearer {tokens[uid]}"}
+        kind = rnd.randrange(5)
+        if kind == 0:
+            return "/courses", None, None
+        if kind == 1:
+            return f"/courses/{rnd.choice(course_ids)}", None, None
+        if kind == 2:
+            return f"/lessons/{rnd.choice(lesson_ids)}", None, None
+        if kind == 3:
+            return "/recommendation/next", {"course_id": rnd.choice(course_ids)}, auth
+        return "/progress/me", None, auth
+
+    async def worker(seed: int, client: httpx.AsyncClient):
+        nonlocal errors
+        rnd = random.Random(seed)
+        while time.perf_counter() < stop_at:
+            path, params, headers = pick(rnd)
+            t0 = time.perf_counter()
+            r = await client.get(path, params=params, headers=headers)
+            latencies.append((time.perf_counter() - t0) * 1e3)
+            if r.status_code >= 500:
+                errors += 1
+
+    limits = httpx.Limits(max_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{args.port}", limits=limits, timeout=60) as client:
+        t0 = time.perf_counter()
+        await asyncio.gather(*(worker(i, client) for i in range(args.concurrency)))
+        elapsed = time.perf_counter() - t0
+
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": len(latencies) / elapsed,
+        "p50_ms": latencies[len(latencies) // 2],
+        "p99_ms": latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))],
+        "mean_ms": statistics.fmean(latencies),
+    }
+
+
+def main():
+    uids, course_ids, lesson_ids = build_dataset(random.Random(0))
+    results = {}
+    for db_async in (False, True):
+        proc = start_server(db_async)
+        try:
+            results["async" if db_async else "sync"] = asyncio.run(drive(uids, course_ids, lesson_ids))
+        finally:
+            proc.terminate()
+            proc.wait(10)
+
+    print(f"concurrency {args.concurrency}, {args.duration:.0f}s per mode, {args.database_url.split(':')[0]}")
+    print(f"{'mode':>6}  {'req/s':>8}  {'p50 ms':>8}  {'p99 ms':>8}  {'errors':>6}")
+    for mode, r in results.items():
+        print(f"{mode:>6}  {r['rps']:>8.0f}  {r['p50_ms']:>8.2f}  {r['p99_ms']:>8.2f}  {r['errors']:>6}")
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump({"params": vars(args), "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+Cost of loading Lesson.content where only lesson metadata is needed.
+
+Seeds the standard 20-course catalog into a throwaway SQLite database and
+compares, per request, the course-tree query of get_course / next_lesson
+as full ORM objects (content included, the pre-projection behaviour) with
+the column-projected row tuples the catalog uses now, plus the same pair
+for the lesson query of a catalog snapshot reload:
+
+    python -m benchmarks.bench_projection [--repeat 200]
+
+"bytes" is the size of the column values fetched (UTF-8 text, 8 bytes per
+number), i.e. what the driver has to transfer and Python has to hold.
+"""
+import argparse
+import statistics
+import time
+
+from ._setup import build_schema, use_database
+
+use_database(prefix="projection-bench-")
+
+from sqlalchemy import asc, select  # noqa: E402
+from sqlalchemy.orm import undefer  # noqa: E402
+
+from app import models  # noqa: E402
+from app.db import SessionLocal  # noqa: E402
+from app.seed import run_seed  # noqa: E402
+
+M, L = models.Module, models.Lesson
+LESSON_COLS = (L.id, L.module_id, L.title, L.lesson_type, L.difficulty, L.sort_order)
+
+
+def size_of(values) -> int:
+    return sum(len(v.encode()) if isinstance(v, str) else 8 for v in values if v is not None)
+
+
+def course_full(db, course_id):
+    """Full ORM objects, content loaded (what the routes did before projection)."""
+    mods = db.query(M).filter(M.course_id == course_id).order_by(asc(M.sort_order)).all()
+    lessons = (
+        db.query(L).options(undefer(L.content))
+        .filter(L.module_id.in_([m.id for m in mods]))
+        .order_by(asc(L.module_id), asc(L.sort_order)).all()
+    )
+    nbytes = sum(size_of((m.id, m.course_id, m.title, m.sort_order)) for m in mods)
+    nbytes += sum(size_of((x.id, x.module_id, x.title, x.lesson_type, x.difficulty, x.sort_order, x.content)) for x in lessons)
+    return nbytes
+
+
+def course_projected(db, course_id):
+    """Only the columns the course tree and the recommender read, as row tuples."""
+    mods = db.execute(
+        select(M.id, M.course_id, M.title, M.sort_order).where(M.course_id == course_id).order_by(asc(M.sort_order))
+    ).all()
+    lessons = db.execute(
+        select(*LESSON_COLS).where(L.module_id.in_([m.id for m in mods])).order_by(asc(L.module_id), asc(L.sort_order))
+    ).all()
+    return sum(size_of(r) for r in mods) + sum(size_of(r) for r in lessons)
+
+
+def snapshot_full(db):
+    rows = db.query(L).options(undefer(L.content)).all()
+    return sum(size_of((x.id, x.module_id, x.title, x.lesson_type, x.difficulty, x.sort_order, x.content)) for x in rows)
+
+
+def snapshot_projected(db):
+    return sum(size_of(r) for r in db.execute(select(*LESSON_COLS)).all())
+
+
+def measure(fn, db, args, repeat):
+    times, nbytes = [], 0
+    for _ in range(repeat):
+        db.expunge_all()  # no identity-map hits between iterations
+        t0 = time.perf_counter()
+        nbytes = fn(db, *args)
+        times.append((time.perf_counter() - t0) * 1e3)
+    return statistics.median(times), nbytes
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--repeat", type=int, default=200)
+    args = ap.parse_args()
+
+    build_schema()
+    db = SessionLocal()
+    try:
+        run_seed(db)
+        course_ids = [cid for (cid,) in db.execute(select(models.Course.id)).all()]
+        print(f"{len(course_ids)} courses, {db.query(L).count()} lessons")
+        print(f"{'path':<28} {'full ms':>9} {'proj ms':>9} {'full KB':>9} {'proj KB':>9} {'saved':>7}")
+
+        rows = []
+        for cid in course_ids:
+            rows.append((
+                measure(course_full, db, (cid,), args.repeat),
+                measure(course_projected, db, (cid,), args.repeat),
+            ))
+        full_ms = statistics.fmean(r[0][0] for r in rows)
+        proj_ms = statistics.fmean(r[1][0] for r in rows)
+        full_b = statistics.fmean(r[0][1] for r in rows)
+        proj_b = statistics.fmean(r[1][1] for r in rows)
+        print(f"{'course tree (mean/course)':<28} {full_ms:>9.3f} {proj_ms:>9.3f} "
+              f"{full_b / 1024:>9.1f} {proj_b / 1024:>9.1f} {1 - proj_b / full_b:>7.0%}")
+
+        (f_ms, f_b), (p_ms, p_b) = (
+            measure(snapshot_full, db, (), max(1, args.repeat // 10)),
+            measure(snapshot_projected, db, (), max(1, args.repeat // 10)),
+        )
+        print(f"{'snapshot reload (lessons)':<28} {f_ms:>9.3f} {p_ms:>9.3f} "
+              f"{f_b / 1024:>9.1f} {p_b / 1024:>9.1f} {1 - p_b / f_b:>7.0%}")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+"""
+End-to-end recommender benchmark on a throwaway SQLite database.
+
+Builds a synthetic catalog (via seed.add_course / course_template), N users
+with random progress, then measures:
+
+  * /recommendation/next latency percentiles, uncached and cached
+  * SQL statements issued per request
+  * pure score_candidate / score_batch throughput
+
+and writes everything to a JSON file so runs can be compared across releases.
+
+    python -m benchmarks.bench_recommendation --users 500 --courses 40 --requests 2000 --out bench_results.json
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+from ._setup import build_schema, use_database
+
+
+def parse_args():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--users", type=int, default=200)
+    ap.add_argument("--courses", type=int, default=20)
+    ap.add_argument("--progress", type=float, default=0.3, help="share of lessons each user has touched")
+    ap.add_argument("--requests", type=int, default=1000)
+    ap.add_argument("--score-candidates", type=int, default=100_000)
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--db", default=None, help="SQLite file (default: temp file)")
+    ap.add_argument("--out", default="bench_results.json")
+    return ap.parse_args()
+
+
+args = parse_args()
+_db_path = args.db or os.path.join(tempfile.mkdtemp(prefix="rec-bench-"), "bench.db")
+if os.path.exists(_db_path):
+    os.remove(_db_path)
+use_database(f"sqlite:///{_db_path}")
+
+from sqlalchemy import event  # noqa: E402
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+from app import models  # noqa: E402
+from app.db import SessionLocal, engine  # noqa: E402
+from app.main import app  # noqa: E402
+from app.rec_cache import rec_cache  # noqa: E402
+from app.recommender import score_batch, score_candidate  # noqa: E402
+from app.security import create_access_token  # noqa: E402
+from app.seed import add_course, seed_course  # noqa: E402
+
+from .bench_scoring import make_candidates  # noqa: E402
+
+
+def synthetic_course(i: int, rnd: random.Random) -> dict:
+    topics = [
+        (f"Course {i} lesson {j}", rnd.randint(1, 3), [f"# Lesson {j}", "", "x" * rnd.randint(200, 2000)])
+        for j in range(6)
+    ]
+    quiz = [
+        {"q": f"Question {q}", "options": ["a", "b", "c", "d"], "answerIndex": rnd.randint(0, 3), "explain": ""}
+        for q in range(5)
+    ]
+    return add_course(f"Synthetic course {i}", f"Synthetic course {i} for benchmarking", topics, quiz)
+
+
+def build_dataset(rnd: random.Random) -> tuple[list[int], list[int]]:
+    build_schema()
+    db = SessionLocal()
+    try:
+        for i in range(args.courses):
+            seed_course(db, synthetic_course(i, rnd))
+
+        db.execute(models.User.__table__.insert(), [
+            {"id": uid, "email": f"user{uid}@bench.local", "password_hash": "x", "role": "student"}
+            for uid in range(1, args.users + 1)
+        ])
+        lesson_ids = [lid for (lid,) in db.query(models.Lesson.id).all()]
+        course_ids = [cid for (cid,) in db.query(models.Course.id).all()]
+
+        rows = []
+        for uid in range(1, args.users + 1):
+            for lid in rnd.sample(lesson_ids, int(len(lesson_ids) * args.progress)):
+                done = rnd.random() < 0.7
+                rows.append({
+                    "user_id": uid,
+                    "lesson_id": lid,
+                    "status": "completed" if done else "in_progress",
+                    "score": round(rnd.random(), 2) if done else None,
+                    "attempts": rnd.randint(1, 4),
+                    "mastery": round(rnd.random(), 2),
+                })
+        if rows:
+            db.execute(models.Progress.__table__.insert(), rows)
+        db.commit()
+        return course_ids, lesson_ids
+    finally:
+        db.close()
+
+
+def percentiles(samples_ms: list[float]) -> dict:
+    s = sorted(samples_ms)
+    pick = lambda q: s[min(len(s) - 1, int(q * len(s)))]  # noqa: E731
+    return {
+        "count": len(s),
+        "mean_ms": statistics.fmean(s),
+        "p50_ms": pick(0.50),
+        "p90_ms": pick(0.90),
+        "p99_ms": pick(0.99),
+        "max_ms": s[-1],
+    }
+
+
+def run_requests(client, course_ids, rnd, counter) -> dict:
+    lat, queries, statuses = [], [], {}
+    for _ in range(args.requests):
+        uid = rnd.randint(1, args.users)
+        headers = {"Authorization": f"Bearer {create_access_token(str(uid))}"}
+        params = {"course_id": rnd.choice(course_ids), "mode": rnd.choice(("adaptive", "baseline"))}
+        counter[0] = 0
+        t0 = time.perf_counter()
+        r = client.get("/recommendation/next", params=params, headers=headers)
+        lat.append((time.perf_counter() - t0) * 1e3)
+        queries.append(counter[0])
+        statuses[r.status_code] = statuses.get(r.status_code, 0) + 1
+    return {
+        "latency": percentiles(lat),
+        "queries_per_request": {"mean": statistics.fmean(queries), "max": max(queries)},
+        "status_codes": {str(k): v for k, v in sorted(statuses.items())},
+    }
+
+
+def scoring_throughput() -> dict:
+    n = args.score_candidates
+    m, a, w, d = make_candidates(n, args.seed)
+    t0 = time.perf_counter()
+    for i in range(n):
+        score_candidate(m[i], a[i], w[i], d[i])
+    t_single = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    score_batch(m, a, w, d)
+    t_batch = time.perf_counter() - t0
+    return {
+        "candidates": n,
+        "score_candidate_per_sec": n / t_single,
+        "score_batch_per_sec": n / t_batch,
+    }
+
+
+def git_rev() -> str | None:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], text=True,
+            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))), stderr=subprocess.DEVNULL,
+        ).strip()
+    except Exception:
+        return None
+
+
+def main():
+    rnd = random.Random(args.seed)
+    course_ids, lesson_ids = build_dataset(rnd)
+
+    counter = [0]
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _count(*_a, **_kw):
+        counter[0] += 1
+
+    results = {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "git_rev": git_rev(),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "params": {k: v for k, v in vars(args).items() if k not in ("db", "out")},
+        "dataset": {"courses": len(course_ids), "lessons": len(lesson_ids), "users": args.users},
+    }
+
+    with TestClient(app) as client:
+        max_entries = rec_cache.max_entries
+        rec_cache.max_entries = 0  # every request goes through the full path
+        rec_cache.clear()
+        results["next_uncached"] = run_requests(client, course_ids, random.Random(args.seed), counter)
+
+        rec_cache.max_entries = max_entries
+        run_requests(client, course_ids, random.Random(args.seed), counter)  # warm up
+        results["next_cached"] = run_requests(client, course_ids, random.Random(args.seed), counter)
+
+    results["scoring"] = scoring_throughput()
+
+    with open(args.out, "w") as f:
+        json.dump(results, f, indent=2)
+
+    for phase in ("next_uncached", "next_cached"):
+        lat = results[phase]["latency"]
+        q = results[phase]["queries_per_request"]["mean"]
+        print(f"{phase:>14}: p50 {lat['p50_ms']:.2f} ms  p99 {lat['p99_ms']:.2f} ms  queries/req {q:.2f}")
+    sc = results["scoring"]
+    print(f"{'scoring':>14}: single {sc['score_candidate_per_sec']:,.0f}/s  batch {sc['score_batch_per_sec']:,.0f}/s")
+    print(f"results written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""
+Scoring throughput: per-candidate score_candidate loop vs score_batch.
+
+    python -m benchmarks.bench_scoring [--sizes 1000 10000 100000] [--repeat 5]
+"""
+import argparse
+import random
+import time
+
+from app.recommender import score_candidate, score_batch, format_reason
+
+
+def make_candidates(n: int, seed: int = 0):
+    rnd = random.Random(seed)
+    mastery = [round(rnd.random(), 2) for _ in range(n)]
+    attempts = [rnd.randint(0, 5) for _ in range(n)]
+    weights = [rnd.choice((0.1, 0.25, 0.4)) for _ in range(n)]
+    difficulty = [rnd.randint(1, 3) for _ in range(n)]
+    return mastery, attempts, weights, difficulty
+
+
+def loop_best(mastery, attempts, weights, difficulty):
+    best = None
+    for i in range(len(mastery)):
+        s, r = score_candidate(mastery[i], attempts[i], weights[i], difficulty[i])
+        if best is None or s > best[0]:
+            best = (s, r, i)
+    return best
+
+
+def batch_best(mastery, attempts, weights, difficulty):
+    scores, i = score_batch(mastery, attempts, weights, difficulty)
+    return float(scores[i]), format_reason(mastery[i], attempts[i], weights[i], difficulty[i]), i
+
+
+def timeit(fn, args, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn(*args)
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    ap.add_argument("--repeat", type=int, default=5)
+    args = ap.parse_args()
+
+    print(f"{'n':>8}  {'loop ms':>10}  {'batch ms':>10}  {'speedup':>8}")
+    for n in args.sizes:
+        cands = make_candidates(n)
+        assert loop_best(*cands) == batch_best(*cands), "batch result differs from loop"
+        t_loop = timeit(loop_best, cands, args.repeat)
+        t_batch = timeit(batch_best, cands, args.repeat)
+        print(f"{n:>8}  {t_loop * 1e3:>10.2f}  {t_batch * 1e3:>10.2f}  {t_loop / t_batch:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
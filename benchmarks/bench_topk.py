@@ -0,0 +1,52 @@
+"""
+Top-K selection cost: bounded heap (top_k) vs sorting every candidate.
+
+    python -m benchmarks.bench_topk [--sizes 1000 10000 100000] [--ks 1 5 20 100]
+
+The heap is O(N log K): per-candidate cost ("heap ns/N") stays flat as N
+grows and only creeps up with K, while the full sort keeps growing with
+log N.
+"""
+import argparse
+import random
+import time
+
+from app.recommender import top_k
+
+
+def full_sort(scores, k):
+    return sorted(range(len(scores)), key=scores.__getitem__, reverse=True)[:k]
+
+
+def timeit(fn, args, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn(*args)
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    ap.add_argument("--ks", type=int, nargs="+", default=[1, 5, 20, 100])
+    ap.add_argument("--repeat", type=int, default=5)
+    args = ap.parse_args()
+
+    print(f"{'n':>8}  {'k':>4}  {'heap ms':>9}  {'sort ms':>9}  {'heap ns/N':>10}  {'sort ns/N':>10}")
+    for n in args.sizes:
+        rnd = random.Random(n)
+        scores = [rnd.random() for _ in range(n)]
+        for k in args.ks:
+            assert top_k(scores, k) == full_sort(scores, k)
+            t_heap = timeit(top_k, (scores, k), args.repeat)
+            t_sort = timeit(full_sort, (scores, k), args.repeat)
+            print(
+                f"{n:>8}  {k:>4}  {t_heap * 1e3:>9.2f}  {t_sort * 1e3:>9.2f}"
+                f"  {t_heap * 1e9 / n:>10.1f}  {t_sort * 1e9 / n:>10.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()